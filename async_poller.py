@@ -0,0 +1,268 @@
+"""Модуль асинхронного опроса нескольких устройств в одном цикле событий"""
+
+import asyncio
+import threading
+import time
+
+from constants import DEFAULT_PORT, DEFAULT_DEVICE_ID, LATE_REPLY_WINDOW
+from device_controller import DeviceController
+from framer import FRAME_SIZE
+
+WAKEUP_CHECK_INTERVAL = 0.05  # Проверка внеочередных запросов при ожидании дедлайна, с
+
+
+def controllers_from_config(config):
+    """Создает контроллеры для всех устройств из конфигурации.
+
+    Поддерживается список "devices" с тройками ip/port/device_id,
+    а при его отсутствии - одиночное устройство из корня конфигурации.
+    """
+    devices = config.get("devices") or [config]
+    controllers = []
+    for device in devices:
+        controller = DeviceController(
+            device["ip"],
+            port=device.get("port", DEFAULT_PORT),
+            device_id=device.get("device_id", DEFAULT_DEVICE_ID),
+            pipelined=device.get("pipelined", True),
+            adaptive_pacing=device.get("adaptive_pacing", False)
+        )
+        controller.read_timeout = device.get("read_timeout", controller.read_timeout)
+        controller.request_retries = device.get("retries", controller.request_retries)
+        controller.poll_delay = device.get("poll_delay", controller.poll_delay)
+        controllers.append(controller)
+    return controllers
+
+
+class AsyncDevicePoller:
+    """Опрашивает несколько устройств в одном потоке через asyncio.
+
+    Контроллеры используются как источники настроек (адрес, таймауты,
+    число повторов, периоды опроса, конвейерный режим, адаптивный темп)
+    и как приемники данных: отсчеты публикуются в тот же буфер
+    controller.samples, что и при DeviceController.start_polling().
+    """
+
+    def __init__(self, controllers):
+        self.controllers = list(controllers)
+        self.running = False
+        self.loop = None
+        self.t = threading.Thread()
+        self._tasks = []
+
+    def start(self):
+        """Запускает цикл событий в отдельном фоновом потоке"""
+        if self.running:
+            return
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self.t = threading.Thread(target=self._run_loop, daemon=True)
+        self.t.start()
+
+    def stop(self, timeout=None):
+        """Останавливает опрос и дожидается завершения потока"""
+        if not self.running:
+            return
+        self.running = False
+        self.loop.call_soon_threadsafe(self._cancel_tasks)
+        self.t.join(timeout)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+
+    async def _main(self):
+        self._tasks = [asyncio.ensure_future(self._poll_device(c)) for c in self.controllers]
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _cancel_tasks(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def _poll_device(self, controller):
+        """Цикл опроса одного устройства - то же поведение, что и у потока опроса.
+
+        Регистры читаются по дедлайнам controller.scheduler, конвейерным
+        пакетом (controller.pipelined) или по одному, с паузой
+        controller.request_gap() (фиксированной или адаптивной). Переподключение
+        повторяется с той же экспоненциальной задержкой и джиттером, что
+        и у controller.connection.
+        """
+        link = _Link(controller)
+        controller.mark_polling_started()
+        try:
+            while self.running:
+                if link.writer is None and not await link.open():
+                    await asyncio.sleep(controller.connection.next_delay(link.failures))
+                    continue
+
+                due, wait = controller.scheduler.due()
+                if not due:
+                    # Планировщик будит поток опроса событием; здесь внеочередные
+                    # запросы (request_poll) проверяются не реже WAKEUP_CHECK_INTERVAL
+                    await asyncio.sleep(WAKEUP_CHECK_INTERVAL if wait is None
+                                        else min(wait, WAKEUP_CHECK_INTERVAL))
+                    continue
+
+                started = time.monotonic()
+                values = await self._read_cycle(controller, link, due)
+                controller.complete_cycle(due, values, started)
+
+                gap = controller.request_gap() - (time.monotonic() - started)
+                if gap > 0:
+                    await asyncio.sleep(gap)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            link.close()
+
+    async def _read_cycle(self, controller, link, addresses):
+        """Читает регистры (конвейерно или по одному): {адрес: значение или None}"""
+        pipelined = controller.pipelined and len(addresses) > 1
+        batch = None
+        if pipelined:
+            batch = await self._read_pipelined(controller, link, addresses)
+        values = dict(batch or {})
+        serial = {}
+        for addr in [addr for addr in addresses if addr not in values]:
+            if link.writer is None:
+                serial[addr] = None
+                continue
+            if values or serial:
+                await asyncio.sleep(controller.request_gap())
+            serial[addr] = await self._read_register(controller, link, addr)
+        if pipelined:
+            controller.record_pipeline(batch, serial)
+        values.update(serial)
+        return values
+
+    async def _read_pipelined(self, controller, link, addresses):
+        """Конвейерное чтение: все запросы одной записью, общий таймаут на пакет.
+
+        Возвращает {адрес: значение} для пришедших ответов (при потере части
+        кадров соединение сохраняется, недостающие регистры дочитываются
+        по одному) или None, если соединение разорвано.
+        """
+        if link.writer is None:
+            return None
+        frames = {}
+        try:
+            started = time.monotonic()
+            link.writer.write(controller.encode_reads(addresses))
+            await link.writer.drain()
+            try:
+                await asyncio.wait_for(
+                    self._receive_frames(controller, link.reader, addresses, started, frames),
+                    timeout=controller.batch_timeout
+                )
+            except asyncio.TimeoutError:
+                controller.record_timeout()
+                print(f"[{controller.ip}:{controller.port}] Конвейерное чтение: таймаут пакета "
+                      f"({len(frames)}/{len(addresses)} кадров)")
+                await link.discard_late_replies()
+        except OSError as e:
+            print(f"[{controller.ip}:{controller.port}] Ошибка конвейерного чтения: {e}")
+            link.close()
+            return None
+        return controller.decode_frames(frames, addresses, started)
+
+    async def _read_register(self, controller, link, address):
+        """Чтение регистра с повторами и переподключением.
+
+        После таймаута запрос повторяется на том же соединении (запоздавшие
+        ответы предварительно отбрасываются), соединение пересоздается
+        при ошибке связи и после последней неудачной попытки.
+        """
+        for attempt in range(controller.request_retries):
+            try:
+                if attempt:
+                    await link.discard_late_replies()
+                started = time.monotonic()
+                link.writer.write(controller.encode_reads([address]))
+                await link.writer.drain()
+                frames = await asyncio.wait_for(
+                    self._receive_frames(controller, link.reader, [address], started),
+                    timeout=controller.read_timeout
+                )
+                return controller.decode_frames(frames, [address], started)[address]
+            except asyncio.TimeoutError as e:
+                controller.record_timeout()
+                print(f"[{controller.ip}:{controller.port}] Таймаут ответа "
+                      f"(попытка {attempt + 1}): {e}")
+                if attempt == controller.request_retries - 1:
+                    link.close()
+                else:
+                    controller.metrics.counter('retries').inc()
+            except OSError as e:
+                print(f"[{controller.ip}:{controller.port}] Ошибка связи "
+                      f"(попытка {attempt + 1}): {e}")
+                link.close()
+                if attempt == controller.request_retries - 1 or not await link.open():
+                    return None
+                controller.metrics.counter('retries').inc()
+        return None
+
+    @staticmethod
+    async def _receive_frames(controller, reader, addresses, started, frames=None):
+        """Читает поток до ответов на все адреса (разбор - controller.take_frames).
+
+        Принятые кадры накапливаются в frames (остаются там и при отмене по таймауту).
+        """
+        if frames is None:
+            frames = {}
+        while not controller.take_frames(addresses, frames, started):
+            chunk = await reader.read(FRAME_SIZE * (len(addresses) - len(frames)))
+            if not chunk:
+                raise ConnectionError("Соединение закрыто устройством")
+            controller.framer.feed(chunk)
+        return frames
+
+
+class _Link:
+    """TCP-соединение асинхронного опроса с одним устройством"""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.reader = None
+        self.writer = None
+        self.opened = 0  # Успешных подключений (все, кроме первого, - переподключения)
+        self.failures = 0  # Неудачных попыток подключения подряд
+
+    async def open(self):
+        """Открывает соединение, False при неудаче"""
+        controller = self.controller
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(controller.ip, controller.port),
+                timeout=controller.read_timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            self.failures += 1
+            print(f"[{controller.ip}:{controller.port}] Ошибка подключения: {e}")
+            return False
+        self.failures = 0
+        controller.reset_link_state()
+        if self.opened:
+            controller.metrics.counter('reconnects').inc()
+        self.opened += 1
+        return True
+
+    async def discard_late_replies(self):
+        """Отбрасывает ответы, пришедшие после таймаута (как DeviceController перед повтором)"""
+        try:
+            while True:
+                chunk = await asyncio.wait_for(self.reader.read(4096), timeout=LATE_REPLY_WINDOW)
+                if not chunk:
+                    raise ConnectionError("Соединение закрыто устройством")
+                self.controller.framer.feed(chunk)
+        except asyncio.TimeoutError:
+            pass
+        self.controller.discard_buffered_frames()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
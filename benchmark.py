@@ -0,0 +1,327 @@
+"""Набор замеров производительности на локальном симуляторе устройства
+
+Результаты пишутся в JSON, чтобы сравнивать коммиты между собой:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --quick --only io,micro
+
+Группы замеров:
+    io     - read_register/write_register: кадров в секунду и процентили задержки
+    poll   - полные циклы опроса всех регистров в секунду (конвейерно и по одному)
+    micro  - crc7_generate, _build_frame, _parse_response (нс на операцию)
+    logger - время сохранения пачки DataLogger в зависимости от размера журнала
+    gui    - время кадра DeviceGUI._update_graphs на внеэкранном бэкенде Agg
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+from constants import REG_STATUS, REG_SET_POSITION, REG_MEASURED_PRESSURE
+from sample_buffer import POLLED_REGISTERS
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Процентили по ближайшему рангу, мс (values - в секундах)"""
+    ordered = sorted(values)
+    if not ordered:
+        return {f"p{q}_ms": None for q in points}
+    return {
+        f"p{q}_ms": ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] * 1000
+        for q in points
+    }
+
+
+def _timed_calls(func, count):
+    """Вызывает func count раз; возвращает (общее время, список длительностей)"""
+    durations = []
+    started = time.perf_counter()
+    for _ in range(count):
+        t = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - t)
+    return time.perf_counter() - started, durations
+
+
+def _controller(port, pipelined=True):
+    from device_controller import DeviceController
+    controller = DeviceController("127.0.0.1", port, device_id=3, pipelined=pipelined)
+    if not controller.connect(timeout=5):
+        raise RuntimeError(f"Нет подключения к симулятору на порту {port}")
+    return controller
+
+
+def bench_io(port, count):
+    """Одиночные транзакции чтения и записи"""
+    controller = _controller(port)
+    try:
+        results = {}
+        for name, call in (
+                ("read_register", lambda: controller.read_register(REG_STATUS)),
+                ("write_register", lambda: controller.write_register(REG_SET_POSITION, 1234)),
+        ):
+            call()  # Прогрев
+            total, durations = _timed_calls(call, count)
+            results[name] = {'count': count, 'frames_per_s': count / total, **percentiles(durations)}
+        return results
+    finally:
+        controller.disconnect()
+
+
+def bench_poll(port, count):
+    """Полные циклы опроса всех регистров (как в start_polling)"""
+    results = {}
+    for mode, pipelined in (("pipelined", True), ("sequential", False)):
+        controller = _controller(port, pipelined=pipelined)
+        controller.poll_delay = 0.0
+        try:
+            addresses = list(POLLED_REGISTERS)
+            controller._poll_registers(addresses)
+            total, durations = _timed_calls(lambda: controller._poll_registers(addresses), count)
+            results[mode] = {
+                'count': count,
+                'cycles_per_s': count / total,
+                'frames_per_s': count * len(addresses) / total,
+                **percentiles(durations),
+            }
+        finally:
+            controller.disconnect()
+    return results
+
+
+def bench_micro(number):
+    """Микрозамеры кодирования и разбора кадров, нс на операцию"""
+    import codec
+    from crc import crc7_generate
+    from device_controller import DeviceController
+
+    controller = DeviceController("127.0.0.1", 1, device_id=3)
+    read_frame = codec.encode(3, REG_STATUS)
+    response = bytes([0xC3, REG_MEASURED_PRESSURE, 0x4E, 0x10])
+    response += bytes([crc7_generate(response)])
+    cases = {
+        'crc7_generate': lambda: crc7_generate(read_frame),
+        'build_frame_read': lambda: controller._build_frame(REG_STATUS),
+        'build_frame_write': lambda: controller._build_frame(REG_SET_POSITION, write=True, data=0xC123),
+        'parse_response': lambda: controller._parse_response(response, REG_MEASURED_PRESSURE),
+    }
+    results = {}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        results[name] = {'ns_per_op': best / number * 1e9, 'number': number}
+    return results
+
+
+def bench_logger(sizes, batch_rows):
+    """Время сохранения пачки из batch_rows строк при разном размере журнала"""
+    from logger import DataLogger
+
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            logger = DataLogger(log_interval=1e9, log_dir=directory, device="bench")
+            filled = 0
+            while filled < size:
+                rows = min(10000, size - filled)
+                for i in range(rows):
+                    logger.add_data(f"2026-01-01 00:00:{i % 60:02d}", 23.5, 100.0 + i, i, 0)
+                logger.flush().result()
+                filled += rows
+
+            durations = []
+            for _ in range(5):
+                for i in range(batch_rows):
+                    logger.add_data("2026-01-01 00:01:00", 23.5, 100.0 + i, i, 0)
+                started = time.perf_counter()
+                logger.flush().result()
+                durations.append(time.perf_counter() - started)
+            logger.close()
+            results.append({
+                'log_rows': size,
+                'batch_rows': batch_rows,
+                'flush_ms_min': min(durations) * 1000,
+                'flush_ms_median': sorted(durations)[len(durations) // 2] * 1000,
+            })
+    return results
+
+
+def bench_gui(frames):
+    """Время кадра _update_graphs без окна: фигура рисуется бэкендом Agg.
+
+    История заполняется отсчетами за сутки с частотой 20 Гц, замеры
+    выполняются для каждого интервала графиков; отдельно - минутный
+    интервал при опросе с частотой 1 кГц.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import gui
+    from history import HistoryStore
+
+    class _Value:
+        def __init__(self, value):
+            self.value = value
+
+        def get(self):
+            return self.value
+
+    class _Window:
+        """Окно без цикла событий: запросы обновления не выполняются"""
+
+        def after(self, ms, func, *args):
+            return None
+
+        def after_cancel(self, after_id):
+            pass
+
+    # Графики создаются тем же _init_graphs, но на внеэкранном холсте
+    gui._load_matplotlib = lambda: (Figure, lambda fig, master=None: FigureCanvasAgg(fig))
+    view = object.__new__(gui.DeviceGUI)
+    view.history = HistoryStore()
+    view.graph_span = _Value(next(iter(gui.GRAPH_SPANS)))
+    view.append_command_log = lambda message: None
+    view.window = _Window()
+    view._init_tick_state()
+    view._init_graphs(None)
+
+    view.history.add(_synthetic_samples(86400, 20))
+    results = {}
+    for span in gui.GRAPH_SPANS:
+        view.graph_span.value = span
+        view._on_span_changed()
+        results[f"span_{gui.GRAPH_SPANS[span][0]}s"] = _gui_frames(view, frames)
+
+    view.history = HistoryStore()
+    view.history.add(_synthetic_samples(60, 1000))
+    view.graph_span.value = next(iter(gui.GRAPH_SPANS))
+    view._on_span_changed()
+    results['span_60s_1khz'] = _gui_frames(view, frames)
+    return results
+
+
+def _synthetic_samples(seconds, rate):
+    """Отсчеты SAMPLE_DTYPE за последние seconds секунд с частотой rate"""
+    import numpy as np
+    from sample_buffer import SAMPLE_DTYPE, FIELD_STATUS, FIELD_PRESSURE, FIELD_TEMPERATURE, FIELD_POSITION
+
+    seq = np.arange(int(seconds * rate))
+    samples = np.zeros(len(seq), dtype=SAMPLE_DTYPE)
+    samples['t_ns'] = ((time.time() - seconds + seq / rate) * 1e9).astype('i8')
+    samples['pressure'] = 1000 + (500 * np.sin(seq / rate / 600)).astype('i4') + seq % 13
+    samples['temperature'] = 235 + seq % 7
+    samples['position'] = seq % 20000
+    samples['fresh'] = FIELD_STATUS | FIELD_PRESSURE | np.where(seq % rate == 0, FIELD_TEMPERATURE, 0) | \
+        np.where(seq % 4 == 0, FIELD_POSITION, 0)
+    return samples
+
+
+def _gui_frames(view, frames):
+    """Замер frames кадров _update_graphs с новыми данными во всех каналах"""
+    durations = []
+    full_redraws = 0
+    for i in range(frames):
+        view.receive_new_temperature_data = True
+        view.receive_new_pressure_data = True
+        view.receive_new_position_data = True
+        background = view.ax1_background
+        view.last_render = 0.0  # Замеряется время кадра, а не ограничение частоты
+        started = time.perf_counter()
+        view._update_graphs()
+        durations.append(time.perf_counter() - started)
+        full_redraws += view.ax1_background is not background
+    return {
+        'frames': frames,
+        'fps_max': frames / sum(durations),
+        'full_redraws': full_redraws,
+        **percentiles(durations),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+GROUPS = ("io", "poll", "micro", "logger", "gui")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности FlowSensor")
+    parser.add_argument("--output", default=None, help="файл JSON с результатами (по умолчанию - stdout)")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"группы через запятую: {','.join(GROUPS)}")
+    parser.add_argument("--quick", action="store_true", help="меньше итераций (для быстрой проверки)")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа симулятора, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="джиттер ответа симулятора, с")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        print(f"Неизвестные группы: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    scale = 0.1 if args.quick else 1.0
+    report = {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': args.quick,
+            'simulator_latency_s': args.latency,
+            'simulator_jitter_s': args.jitter,
+        },
+        'results': {},
+    }
+
+    simulator = None
+    if {"io", "poll"} & set(groups):
+        from simulator import Simulator, FaultConfig
+        simulator = Simulator(faults=FaultConfig(latency=args.latency, jitter=args.jitter, seed=0))
+        port = simulator.start()[0]
+
+    try:
+        for group in groups:
+            print(f"[benchmark] {group}...", file=sys.stderr, flush=True)
+            if group == "io":
+                result = bench_io(port, max(50, int(2000 * scale)))
+            elif group == "poll":
+                result = bench_poll(port, max(20, int(500 * scale)))
+            elif group == "micro":
+                result = bench_micro(max(1000, int(100000 * scale)))
+            elif group == "logger":
+                sizes = (0, 10000) if args.quick else (0, 10000, 100000, 500000)
+                result = bench_logger(sizes, batch_rows=600)
+            else:
+                result = bench_gui(max(20, int(300 * scale)))
+            report['results'][group] = result
+    finally:
+        if simulator is not None:
+            simulator.stop()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[benchmark] результаты записаны в {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
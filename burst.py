@@ -0,0 +1,121 @@
+"""Модуль захвата серии измерений в фоновом потоке"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+from constants import BURST_MAX_FAILURES, BURST_PROGRESS_INTERVAL
+from sample_buffer import SampleRingBuffer
+
+_burst_numbers = itertools.count(1)
+
+
+class BurstCapture:
+    """Серия из count отсчетов (или за duration секунд) с максимальной скоростью канала.
+
+    Циклы чтения выполняются в отдельном потоке друг за другом с паузой,
+    которую задает gap() (темп канала). Ход серии передается в
+    on_progress(готово, всего) не чаще раза в BURST_PROGRESS_INTERVAL,
+    по окончании вызывается on_done(захват) и завершается future
+    с массивом отсчетов SAMPLE_DTYPE. Обратные вызовы выполняются в потоке
+    серии - GUI должен перенаправлять их в свой поток.
+    """
+
+    def __init__(self, read_cycle, count=None, duration=None, gap=None,
+                 on_progress=None, on_done=None, max_failures=BURST_MAX_FAILURES):
+        """
+        :param read_cycle: функция чтения одного цикла: () -> {адрес: значение} или None
+        :param count: число отсчетов в серии
+        :param duration: длительность серии, с
+        :param gap: функция, возвращающая паузу между циклами, с
+        """
+        if count is None and duration is None:
+            raise ValueError("Нужно задать count или duration")
+        self.burst_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(_burst_numbers)}"
+        self.count = count
+        self.duration = duration
+        self.read_cycle = read_cycle
+        self.gap = gap or (lambda: 0.0)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.max_failures = max_failures
+        self.future = Future()
+        self.samples = None
+        self.error = None
+        self.captured = 0
+        self.failures = 0  # Неудачных циклов за серию
+        self.started = None
+        self.elapsed = 0.0
+        self._cycles = []
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"burst-{self.burst_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Прерывает серию; уже полученные отсчеты сохраняются"""
+        self._cancel.set()
+
+    @property
+    def rate_hz(self):
+        return self.captured / self.elapsed if self.elapsed > 0 else 0.0
+
+    def _finished(self, now):
+        if self.count is not None and self.captured >= self.count:
+            return True
+        return self.duration is not None and now - self.started >= self.duration
+
+    def _run(self):
+        self.started = time.monotonic()
+        last_progress = self.started
+        streak = 0
+        try:
+            while not self._cancel.is_set() and not self._finished(time.monotonic()):
+                cycle_start = time.monotonic()
+                values = self.read_cycle()
+                if not values or all(v is None for v in values.values()):
+                    self.failures += 1
+                    streak += 1
+                    if streak >= self.max_failures:
+                        raise ConnectionError(f"Нет ответа устройства ({streak} циклов подряд)")
+                else:
+                    streak = 0
+                    self._cycles.append((values, cycle_start, time.time_ns()))
+                    self.captured += 1
+
+                now = time.monotonic()
+                if self.on_progress is not None and now - last_progress >= BURST_PROGRESS_INTERVAL:
+                    last_progress = now
+                    self.on_progress(self.captured, self.count)
+
+                gap = self.gap() - (now - cycle_start)
+                if gap > 0:
+                    self._cancel.wait(gap)
+        except Exception as e:
+            self.error = e
+
+        self.elapsed = time.monotonic() - self.started
+        self.samples = self._build_samples()
+        if self.on_progress is not None:
+            self.on_progress(self.captured, self.count)
+        if self.on_done is not None:
+            try:
+                self.on_done(self)
+            except Exception as e:
+                print(f"[burst] Ошибка обработчика завершения: {e}")
+        if self.error is not None and not self.captured:
+            self.future.set_exception(self.error)
+        else:
+            self.future.set_result(self.samples)
+
+    def _build_samples(self):
+        """Собирает отсчеты серии в массив SAMPLE_DTYPE"""
+        # Запас в один слот: буфер не считает отсчеты перезаписанными
+        buffer = SampleRingBuffer(len(self._cycles) + 1)
+        for values, t_mono, t_ns in self._cycles:
+            buffer.append(values, t_mono=t_mono, t_ns=t_ns)
+        samples, _, _ = buffer.read(0)
+        return samples
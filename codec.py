@@ -0,0 +1,116 @@
+"""Модуль кодирования и декодирования 5-байтовых кадров протокола"""
+
+import numpy as np
+
+from crc import CRC7_TABLE, crc7_generate, crc7_update
+from framer import FRAME_SIZE, FRAME_MARKER
+
+WRITE_FLAG = 0x20
+
+# Готовые кадры чтения по ключу (device_id, address)
+_read_frames = {}
+# Первый байт кадра записи и CRC7 после первых двух байт по ключу
+# (device_id, address, два старших бита данных)
+_write_prefixes = {}
+
+
+def encode_read(device_id, address):
+    """Возвращает кадр чтения регистра (кадры кэшируются)"""
+    key = (device_id & 0x07, address & 0x7F)
+    frame = _read_frames.get(key)
+    if frame is None:
+        header = bytes([FRAME_MARKER | key[0], key[1], 0x00, 0x00])
+        frame = header + bytes([crc7_generate(header)])
+        _read_frames[key] = frame
+    return frame
+
+
+def _write_prefix(device_id, address, high_bits):
+    key = (device_id & 0x07, address & 0x7F, high_bits)
+    prefix = _write_prefixes.get(key)
+    if prefix is None:
+        byte1 = FRAME_MARKER | WRITE_FLAG | (high_bits << 3) | key[0]
+        prefix = (byte1, key[1], crc7_update(crc7_update(0, byte1), key[1]))
+        _write_prefixes[key] = prefix
+    return prefix
+
+
+def encode_write(device_id, address, data):
+    """Собирает кадр записи: заголовок и частичная CRC7 берутся из таблицы"""
+    byte1, byte2, crc = _write_prefix(device_id, address, (data >> 14) & 0x03)
+    byte3 = (data >> 7) & 0x7F
+    byte4 = data & 0x7F
+    crc = crc7_update(crc7_update(crc, byte3), byte4)
+    return bytes((byte1, byte2, byte3, byte4, crc))
+
+
+def encode(device_id, address, write=False, data=0x0000):
+    """Собирает кадр согласно протоколу"""
+    if write:
+        return encode_write(device_id, address, data)
+    if not data:
+        return encode_read(device_id, address)
+
+    # Чтение с ненулевым полем данных - не кэшируется
+    byte1 = FRAME_MARKER | ((data >> 14) & 0x03) << 3 | device_id & 0x07
+    frame = bytes([byte1, address & 0x7F, (data >> 7) & 0x7F, data & 0x7F])
+    return frame + bytes([crc7_generate(frame)])
+
+
+def decode(response, device_id, expected_address):
+    """Проверяет ответный кадр и возвращает значение регистра или None"""
+    if len(response) != FRAME_SIZE:
+        return None
+    byte1 = response[0]
+    if (byte1 & 0xC7) != (FRAME_MARKER | device_id):
+        return None
+    if (response[1] & 0x7F) != expected_address:
+        return None
+    if crc7_generate(response) != (response[4] & 0x7F):
+        return None
+
+    return (
+            ((byte1 >> 4) & 0x03) << 14 |
+            (response[2] & 0x7F) << 7 |
+            response[3] & 0x7F
+    )
+
+
+_CRC7_TABLE_NP = np.array(CRC7_TABLE, dtype=np.uint8)
+
+
+def decode_frames(frames, device_id=None):
+    """Пакетное декодирование захваченных кадров для офлайн-анализа.
+
+    :param frames: bytes/bytearray с выровненным дампом или массив формы (N, 5)
+    :param device_id: если задан, кадры других устройств считаются невалидными
+    :return: словарь массивов длины N: valid, device_id, address, write, value
+    """
+    if isinstance(frames, (bytes, bytearray, memoryview)):
+        raw = np.frombuffer(frames, dtype=np.uint8)
+        frames = raw[:len(raw) - len(raw) % FRAME_SIZE].reshape(-1, FRAME_SIZE)
+    else:
+        frames = np.asarray(frames, dtype=np.uint8).reshape(-1, FRAME_SIZE)
+
+    crc = np.zeros(len(frames), dtype=np.uint8)
+    for column in range(4):
+        crc = _CRC7_TABLE_NP[((crc.astype(np.uint16) << 1) ^ (frames[:, column] & 0x7F)) & 0x7F]
+
+    byte1 = frames[:, 0]
+    ids = byte1 & 0x07
+    valid = ((byte1 & FRAME_MARKER) == FRAME_MARKER) & (crc == (frames[:, 4] & 0x7F))
+    if device_id is not None:
+        valid &= ids == (device_id & 0x07)
+
+    value = (
+            ((byte1.astype(np.uint32) >> 4) & 0x03) << 14 |
+            (frames[:, 2].astype(np.uint32) & 0x7F) << 7 |
+            frames[:, 3].astype(np.uint32) & 0x7F
+    )
+    return {
+        'valid': valid,
+        'device_id': ids,
+        'address': frames[:, 1] & 0x7F,
+        'write': (byte1 & WRITE_FLAG) != 0,
+        'value': value,
+    }
@@ -0,0 +1,13 @@
+"""Модуль загрузки конфигурации"""
+
+import json
+from pathlib import Path
+
+
+def load_config(config_path="config.json"):
+    """Загрузка настроек устройства из JSON-файла"""
+    config_file = Path(config_path)
+    if not config_file.exists():
+        raise FileNotFoundError(f"Файл конфигурации не найден: {config_path}")
+    with open(config_file, "r") as f:
+        return json.load(f)
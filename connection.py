@@ -0,0 +1,154 @@
+"""Модуль фонового управления TCP-соединением с устройством"""
+
+import random
+import threading
+import time
+
+from constants import RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY, RECONNECT_JITTER
+
+STATE_DISCONNECTED = "disconnected"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+
+
+class ConnectionManager:
+    """Переподключается к устройству в фоновом потоке.
+
+    Попытки повторяются с экспоненциально растущей задержкой и случайным
+    джиттером, чтобы стенд из многих устройств не переподключался
+    синхронно. Вызывающие потоки не ждут переподключения: они проверяют
+    state и сразу получают отказ, пока соединение не восстановлено.
+    """
+
+    def __init__(self, open_func, base_delay=RECONNECT_BASE_DELAY,
+                 max_delay=RECONNECT_MAX_DELAY, jitter=RECONNECT_JITTER, name="connection"):
+        """
+        :param open_func: функция одной попытки подключения, True при успехе
+        :param base_delay: задержка перед второй попыткой, с
+        :param max_delay: верхняя граница задержки, с
+        :param jitter: относительный разброс задержки (0.2 = ±20%)
+        """
+        self.open_func = open_func
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.name = name
+        self.state = STATE_DISCONNECTED
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+        self.t = None
+
+        # Статистика переподключений
+        self.attempts = 0
+        self.failures = 0
+        self.reconnects = 0
+        self.disconnected_since = time.monotonic()
+        self.last_outage = None
+        self.max_outage = 0.0
+        self.total_downtime = 0.0
+
+    def add_listener(self, func):
+        """Подписывает func(state) на смену состояния (вызывается из фонового потока)"""
+        self._listeners.append(func)
+
+    def remove_listener(self, func):
+        """Отписывает func от смены состояния"""
+        if func in self._listeners:
+            self._listeners.remove(func)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        for func in list(self._listeners):
+            try:
+                func(state)
+            except Exception as e:
+                print(f"[{self.name}] Ошибка обработчика состояния: {e}")
+
+    @property
+    def connected(self):
+        return self.state == STATE_CONNECTED
+
+    def request_reconnect(self):
+        """Запускает фоновое переподключение, если оно еще не идет"""
+        with self._lock:
+            if self.state != STATE_DISCONNECTED:
+                return
+            self._stop.clear()
+            self._set_state(STATE_CONNECTING)
+            self.t = threading.Thread(target=self._run, name=f"{self.name}-reconnect", daemon=True)
+            self.t.start()
+
+    def mark_disconnected(self, reason=None):
+        """Сообщает о потере соединения и запускает переподключение"""
+        with self._lock:
+            if self.state != STATE_CONNECTED:
+                return
+            self._connected.clear()
+            self.disconnected_since = time.monotonic()
+            self._set_state(STATE_DISCONNECTED)
+        if reason is not None:
+            print(f"[{self.name}] Соединение потеряно: {reason}")
+        self.request_reconnect()
+
+    def wait_connected(self, timeout=None):
+        """Ждет установления соединения, возвращает True при успехе"""
+        return self._connected.wait(timeout)
+
+    def stop(self, timeout=None):
+        """Прекращает попытки переподключения (ждет поток не дольше timeout секунд)"""
+        self._stop.set()
+        t = self.t
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout)
+        with self._lock:
+            self._connected.clear()
+            self._set_state(STATE_DISCONNECTED)
+
+    def next_delay(self, failures):
+        """Задержка перед следующей попыткой после failures неудач подряд, с"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (failures - 1)))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            self.attempts += 1
+            try:
+                ok = self.open_func()
+            except Exception as e:
+                print(f"[{self.name}] Попытка подключения {self.attempts}: {e}")
+                ok = False
+
+            if ok:
+                with self._lock:
+                    if self._stop.is_set():
+                        return
+                    outage = time.monotonic() - self.disconnected_since
+                    self.last_outage = outage
+                    self.max_outage = max(self.max_outage, outage)
+                    self.total_downtime += outage
+                    self.reconnects += 1
+                    self._connected.set()
+                    self._set_state(STATE_CONNECTED)
+                return
+
+            failures += 1
+            self.failures += 1
+            self._stop.wait(self.next_delay(failures))
+
+    def stats(self):
+        """Статистика переподключений"""
+        return {
+            'state': self.state,
+            'attempts': self.attempts,
+            'failures': self.failures,
+            'reconnects': self.reconnects,
+            'last_outage_s': self.last_outage,
+            'max_outage_s': self.max_outage,
+            'total_downtime_s': self.total_downtime,
+            'mean_outage_s': self.total_downtime / self.reconnects if self.reconnects else None,
+        }
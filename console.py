@@ -0,0 +1,236 @@
+"""Модуль журнала сообщений окна: очередь, подавление повторов и копия в файл"""
+
+import collections
+import itertools
+import os
+import threading
+import time
+from pathlib import Path
+from queue import Queue, Full
+
+from constants import (
+    CONSOLE_MAX_LINES, CONSOLE_QUEUE_SIZE, CONSOLE_RATE_LIMIT, CONSOLE_DEDUP_WINDOW,
+    CONSOLE_MIRROR_MAX_BYTES, CONSOLE_MIRROR_BACKUPS, CONSOLE_MIRROR_QUEUE_SIZE
+)
+
+
+class RotatingTextFile:
+    """Текстовый файл с ротацией по размеру: path, path.1, ..., path.<backups>"""
+
+    def __init__(self, path, max_bytes=CONSOLE_MIRROR_MAX_BYTES, backups=CONSOLE_MIRROR_BACKUPS):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+
+    def write(self, text):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(text)
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if not self.backups:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            older = Path(f"{self.path}.{i}")
+            if older.exists():
+                os.replace(older, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Console:
+    """Журнал сообщений для окна вывода команд.
+
+    write() можно вызывать из любого потока: сообщение только добавляется
+    в deque (append атомарен, блокировок нет) и устанавливается флаг
+    pending, Tk не вызывается. flush() вызывается в потоке Tk раз за
+    обновление окна и вставляет все накопленное в виджет одной
+    вставкой, удаляя строки сверх max_lines. Одинаковые сообщения
+    в пределах dedup_window показываются один раз (число повторов - после
+    окна), а сверх rate_limit сообщений в секунду - только считаются.
+    Копия журнала (mirror_path) пишется с отметками времени, до ограничения
+    частоты, в файл с ротацией. Запись выполняет отдельный поток через
+    ограниченную очередь, так что flush() не обращается к диску; если диск
+    не успевает, пачки строк копии отбрасываются и учитываются в mirror_dropped.
+    """
+
+    def __init__(self, max_lines=CONSOLE_MAX_LINES, rate_limit=CONSOLE_RATE_LIMIT,
+                 dedup_window=CONSOLE_DEDUP_WINDOW, mirror_path=None, queue_size=CONSOLE_QUEUE_SIZE):
+        self.max_lines = max_lines
+        self.rate_limit = rate_limit
+        self.dedup_window = dedup_window
+        self.mirror = RotatingTextFile(mirror_path) if mirror_path else None
+        self._mirror_queue = Queue(maxsize=CONSOLE_MIRROR_QUEUE_SIZE)
+        self._mirror_writer = None
+        if self.mirror is not None:
+            self._mirror_writer = threading.Thread(target=self._mirror_loop, name="console-mirror", daemon=True)
+            self._mirror_writer.start()
+        self.widget = None  # Text/ScrolledText, задается после создания окна
+        self.pending = False  # Есть сообщения для flush() (проверяет цикл окна)
+        self._queue = collections.deque(maxlen=queue_size)
+        self._seq = itertools.count()  # next() атомарен, номера сообщений без блокировок
+        self._seen = 0  # Номер последнего разобранного сообщения + 1
+        self._recent = {}  # Сообщение -> [время показа, число подавленных повторов]
+        self._last_prune = 0.0
+        self._tokens = float(rate_limit)
+        self._refilled = time.monotonic()
+        self._limited = 0  # Отброшено ограничением частоты с последнего уведомления
+        self._lines = 0  # Строк в виджете
+        self.received = 0
+        self.shown = 0
+        self.suppressed = 0
+        self.rate_limited = 0
+        self.overflowed = 0
+        self.mirror_dropped = 0
+
+    def write(self, message):
+        """Добавляет сообщение в очередь (из любого потока)"""
+        self._queue.append((next(self._seq), time.time(), message))
+        self.pending = True
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'shown': self.shown,
+            'suppressed': self.suppressed,
+            'rate_limited': self.rate_limited,
+            'overflowed': self.overflowed,
+            'mirror_dropped': self.mirror_dropped,
+            'queued': len(self._queue),
+            'lines': self._lines,
+        }
+
+    def _collect(self):
+        """Разбирает очередь: подавляет повторы, передает копию на запись; возвращает строки для показа"""
+        now = time.time()
+        lines = []
+        while True:
+            try:
+                seq, stamp, message = self._queue.popleft()
+            except IndexError:
+                break
+            self.received += 1
+            self._seen = max(self._seen, seq + 1)
+            entry = self._recent.get(message)
+            if entry is not None and stamp - entry[0] < self.dedup_window:
+                entry[1] += 1
+                self.suppressed += 1
+                continue
+            if entry is not None and entry[1]:
+                lines.append((stamp, self._repeated(message, entry[1])))
+            self._recent[message] = [stamp, 0]
+            lines.append((stamp, message))
+
+        overflowed = self._seen - self.received - self.overflowed
+        if overflowed > 0:
+            # Очередь переполнялась (окно не успевало): старые сообщения потеряны
+            self.overflowed += overflowed
+            self._limited += overflowed
+
+        if now - self._last_prune >= 1.0:
+            # Окно подавления истекло: сообщаем, сколько раз сообщение повторилось
+            self._last_prune = now
+            for message, (shown, repeats) in list(self._recent.items()):
+                if now - shown >= self.dedup_window:
+                    del self._recent[message]
+                    if repeats:
+                        lines.append((now, self._repeated(message, repeats)))
+
+        if lines and self.mirror is not None:
+            try:
+                self._mirror_queue.put_nowait(lines)
+            except Full:
+                self.mirror_dropped += len(lines)
+        return [message for _, message in lines]
+
+    def _mirror_loop(self):
+        """Поток записи копии журнала: пишет пачки строк из очереди по порядку"""
+        while True:
+            lines = self._mirror_queue.get()
+            if lines is None:
+                break
+            mirror = self.mirror
+            if mirror is None:
+                continue
+            try:
+                mirror.write(''.join(
+                    f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stamp))} {message}\n"
+                    for stamp, message in lines
+                ))
+            except OSError:
+                self.mirror = None  # Копия журнала необязательна, окно продолжает работать
+                mirror.close()
+        if self.mirror is not None:
+            self.mirror.close()
+
+    @staticmethod
+    def _repeated(message, repeats):
+        return f"{message} (повторено еще {repeats} раз)"
+
+    def _rate_limit(self, lines):
+        """Оставляет не больше rate_limit сообщений в секунду"""
+        now = time.monotonic()
+        self._tokens = min(float(self.rate_limit), self._tokens + (now - self._refilled) * self.rate_limit)
+        self._refilled = now
+        allowed = int(self._tokens)
+        if len(lines) > allowed:
+            self._limited += len(lines) - allowed
+            self.rate_limited += len(lines) - allowed
+            lines = lines[:allowed]
+        self._tokens -= len(lines)
+        if self._limited and self._tokens >= 1:
+            lines.append(f"... пропущено сообщений: {self._limited}")
+            self._limited = 0
+        return lines
+
+    def flush(self):
+        """Переносит накопленные сообщения в виджет (в потоке Tk), возвращает число строк"""
+        if self.widget is None:
+            return 0
+        self.pending = False  # До разбора очереди: сообщение, пришедшее во время flush, не теряется
+        lines = self._collect()
+        if lines:
+            lines = self._rate_limit(lines)
+        elif self._limited:
+            lines = self._rate_limit([])
+        if not lines:
+            return 0
+        text = ''.join(message + '\n' for message in lines)
+        self.widget.insert('end', text)
+        self._lines += text.count('\n')
+        self.shown += len(lines)
+        if self._lines > self.max_lines + self.max_lines // 10:
+            # Удаляем с запасом, чтобы не обрезать виджет на каждом кадре
+            excess = self._lines - self.max_lines
+            self.widget.delete('1.0', f"{excess + 1}.0")
+            self._lines = self.max_lines
+        self.widget.see('end')
+        return len(lines)
+
+    def close(self, timeout=None):
+        """Дописывает очередь в копию журнала, останавливает поток записи и закрывает файл
+
+        :param timeout: ожидание записи, с (None - без ограничения)
+        """
+        self._collect()
+        writer, self._mirror_writer = self._mirror_writer, None
+        if writer is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._mirror_queue.put(None, timeout=timeout)
+        except Full:
+            return  # Диск не отвечает: копия журнала не дописывается
+        writer.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
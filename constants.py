@@ -6,10 +6,24 @@ CRC7_POLYNOMIAL = 0x89  # x^7 + x^3 + 1
 # Настройки подключения
 DEFAULT_PORT = 502
 DEFAULT_DEVICE_ID = 0x03
-RECONNECT_ATTEMPTS = 3
 RECONNECT_DELAY = 2
+RECONNECT_BASE_DELAY = 0.5  # Задержка перед второй попыткой переподключения, с
+RECONNECT_MAX_DELAY = 30.0  # Верхняя граница экспоненциальной задержки, с
+RECONNECT_JITTER = 0.2  # Случайный разброс задержки, ±20%
 READ_TIMEOUT = 3.0
 WRITE_TIMEOUT = 5.0
+REQUEST_RETRIES = 3
+LATE_REPLY_WINDOW = 0.005  # Ожидание запоздавших ответов перед повтором запроса, с
+KEEPALIVE_IDLE = 5  # TCP keepalive: простой до первой пробы, с
+KEEPALIVE_INTERVAL = 1  # TCP keepalive: интервал между пробами, с
+KEEPALIVE_COUNT = 3  # TCP keepalive: число проб до разрыва
+HEARTBEAT_IDLE = 2.0  # Простой канала до контрольного чтения статуса, с
+POLL_DELAY = 0.01  # Минимальная пауза между запросами к устройству, с
+PACING_MIN_GAP = 0.0  # Нижняя граница адаптивной паузы между запросами, с
+PACING_MAX_GAP = 0.5  # Верхняя граница адаптивной паузы между запросами, с
+PACING_WINDOW = 200  # Число последних транзакций для процентилей RTT и доли ошибок
+PIPELINE_BATCH_TIMEOUT = 1.0  # Таймаут на весь пакет ответов конвейерного чтения, с
+PIPELINE_MAX_FAILURES = 3  # Число неудачных пакетов подряд до перехода в последовательный режим
 
 # Адреса регистров
 REG_STATUS = 0x00
@@ -21,6 +35,34 @@ REG_COMMAND = 0x08
 REG_SET_PRESSURE = 0x09
 REG_SET_POSITION = 0x0A
 
+# Периоды опроса регистров по умолчанию, с (None - только по запросу)
+DEFAULT_POLL_PERIODS = {
+    REG_STATUS: 0.05,  # 20 Гц
+    REG_MEASURED_PRESSURE: 0.05,  # 20 Гц
+    REG_TEMPERATURE: 1.0,  # 1 Гц
+    REG_POSITION_LO: 0.2,  # Младшая и старшая части позиции
+    REG_POSITION_HI: 0.2,  # читаются с одним периодом
+}
+SAMPLE_BUFFER_CAPACITY = 4096  # Емкость кольцевого буфера отсчетов
+POLL_STATS_INTERVAL = 1.0  # Период отчета о частоте и джиттере опроса, с
+BURST_MAX_FAILURES = 5  # Неудачных циклов подряд, после которых серия прерывается
+BURST_PROGRESS_INTERVAL = 0.2  # Период отчета о ходе серии измерений, с
+HISTORY_RAW_CAPACITY = 65536  # Сырых отсчетов в истории графиков (~1 мин при 1 кГц, 2 МБ)
+HISTORY_TIERS = (  # Уровни истории: (интервал агрегации, с; число интервалов)
+    (1.0, 3600),  # 1 час
+    (10.0, 8640),  # 1 сутки
+    (60.0, 10080),  # 1 неделя
+)
+HISTORY_MAX_POINTS = 1500  # Максимум точек на график при выборке из истории
+GRAPHS_SOURCE_POINTS = 65536  # Максимум точек истории, прореживаемых до ширины графика
+CONSOLE_MAX_LINES = 2000  # Строк в окне вывода команд, старые строки удаляются
+CONSOLE_QUEUE_SIZE = 10000  # Сообщений в очереди до показа (при переполнении теряются старые)
+CONSOLE_RATE_LIMIT = 50  # Сообщений в секунду в окне вывода, остальные только считаются
+CONSOLE_DEDUP_WINDOW = 10.0  # Повтор того же сообщения за это время не показывается, с
+CONSOLE_MIRROR_MAX_BYTES = 1_000_000  # Размер файла-копии журнала до ротации, байт
+CONSOLE_MIRROR_BACKUPS = 3  # Число старых файлов-копии журнала
+CONSOLE_MIRROR_QUEUE_SIZE = 256  # Пачек строк в очереди записи копии журнала (при переполнении теряются)
+
 # Команды
 CMD_START = 0x01
 CMD_OPEN = 0x02
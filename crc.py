@@ -26,4 +26,9 @@ def crc7_generate(packet):
         b = byte & 0x7F  # Используем только 7 младших битов
         index = ((crc7_accum << 1) ^ b) & 0x7F
         crc7_accum = CRC7_TABLE[index]
-    return crc7_accum
\ No newline at end of file
+    return crc7_accum
+
+
+def crc7_update(crc7_accum, byte):
+    """Продолжает вычисление CRC7 еще одним байтом кадра."""
+    return CRC7_TABLE[((crc7_accum << 1) ^ (byte & 0x7F)) & 0x7F]
@@ -3,64 +3,169 @@
 import socket
 import threading
 import time
-from queue import Queue
 
 from constants import (
-    DEFAULT_PORT, DEFAULT_DEVICE_ID, RECONNECT_ATTEMPTS, RECONNECT_DELAY,
-    READ_TIMEOUT, WRITE_TIMEOUT, REG_STATUS, REG_MEASURED_PRESSURE,
-    REG_TEMPERATURE, REG_POSITION_LO, REG_POSITION_HI, REG_COMMAND, REG_SET_PRESSURE, REG_SET_POSITION,
-    CMD_START, CMD_OPEN, CMD_CLOSE, CMD_STOP, CMD_SAVE_FLASH, CMD_MIDDLE_POSITION
+    DEFAULT_PORT, DEFAULT_DEVICE_ID, RECONNECT_DELAY,
+    READ_TIMEOUT, WRITE_TIMEOUT, REQUEST_RETRIES, LATE_REPLY_WINDOW, POLL_DELAY,
+    PIPELINE_BATCH_TIMEOUT, PIPELINE_MAX_FAILURES, DEFAULT_POLL_PERIODS, POLL_STATS_INTERVAL,
+    SAMPLE_BUFFER_CAPACITY, REG_STATUS
 )
-from crc import crc7_generate
+import codec
+from burst import BurstCapture
+from connection import ConnectionManager
+from liveness import LivenessMonitor, configure_keepalive
+from framer import FrameReader, FRAME_SIZE
+from metrics import MetricsRegistry
+from pacing import AdaptivePacer
+from sample_buffer import SampleRingBuffer, POLLED_REGISTERS
+from scheduler import PollScheduler
+from transaction import TransactionWorker, PRIORITY_COMMAND, PRIORITY_POLL
 
 
 class DeviceController:
     """Класс для управления устройством через TCP-соединение"""
 
-    def __init__(self, ip, port=DEFAULT_PORT, device_id=DEFAULT_DEVICE_ID):
-        """Инициализация контроллера устройства"""
+    def __init__(self, ip, port=DEFAULT_PORT, device_id=DEFAULT_DEVICE_ID, pipelined=True,
+                 adaptive_pacing=False, metrics=None):
+        """Инициализация контроллера устройства
+
+        :param metrics: реестр метрик (по умолчанию - собственный)
+        """
         self.ip = ip
         self.port = port
         self.device_id = device_id & 0x07  # 3 бита (0-7)
         self.sock = None
+        self.framer = FrameReader()
         self.connection_lock = threading.Lock()
+        self.io = TransactionWorker(name=f"io-{ip}:{port}")
+        self.connection = ConnectionManager(self._open_socket, name=f"{ip}:{port}")
+        self.liveness = LivenessMonitor(
+            self._heartbeat, is_connected=lambda: self.connection.connected, name=f"{ip}:{port}"
+        )
+        self._sock_timeout = None
         self._init_queues()
         self.running = False
-        self.reconnect_attempts = RECONNECT_ATTEMPTS
         self.reconnect_delay = RECONNECT_DELAY
         self.read_timeout = READ_TIMEOUT
         self.write_timeout = WRITE_TIMEOUT
+        self.request_retries = REQUEST_RETRIES
+        self.poll_delay = POLL_DELAY
+        self.adaptive_pacing = adaptive_pacing  # Подбирать паузу между запросами по RTT и ошибкам
+        self.pacer = AdaptivePacer(POLL_DELAY)
+        self._resyncs_seen = 0
+        self._crc_errors_seen = 0
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._rtt_histograms = {}
+        self._poll_cycle_histogram = self.metrics.histogram('poll_cycle')
+        self.pipelined = pipelined  # Конвейерное чтение регистров одним пакетом
+        self.batch_timeout = PIPELINE_BATCH_TIMEOUT
+        self.pipeline_failures = 0
+        self._pipeline_lock = threading.Lock()  # Исходы пакетов учитывают опрос и серия измерений
+        self.scheduler = PollScheduler(DEFAULT_POLL_PERIODS)
+        self.poll_stats_interval = POLL_STATS_INTERVAL
         self.t = threading.Thread()
         self.start_polling_time = time.time()
+        self._last_poll_report = time.monotonic()
         self.func_calc_time = None
+        self.func_poll_stats = None
+        self.func_new_sample = None
+
+    @property
+    def log_name(self):
+        """Имя устройства в журнале и метриках.
+
+        Порт входит в имя: на одном адресе могут быть несколько устройств
+        с одинаковым ID (шлюз с портами на каждую линию, simulator.py --count).
+        """
+        return f"{self.ip}_{self.port}_{self.device_id}"
 
     def _init_queues(self):
-        """Инициализация очередей для данных"""
-        self.status_queue = Queue(maxsize=100)
-        self.temperature_queue = Queue(maxsize=100)
-        self.position_queue_LO = Queue(maxsize=100)
-        self.position_queue_HI = Queue(maxsize=100)
-        self.measured_pressure_queue = Queue(maxsize=100)
-
-    def _reconnect(self):
-        """Пытается переподключиться к устройству"""
+        """Инициализация буфера отсчетов опроса"""
+        self.samples = SampleRingBuffer(SAMPLE_BUFFER_CAPACITY)
+
+    def _publish_sample(self, values):
+        """Публикует отсчет одного цикла опроса: {адрес: значение или None}"""
+        seq = self.samples.append(values)
+        if seq is not None and self.func_new_sample is not None:
+            self.func_new_sample()
+        return seq
+
+    def _open_socket(self):
+        """Одна попытка подключения (вызывается менеджером соединения в фоне)"""
+        sock = self._create_socket()
         with self.connection_lock:
-            for attempt in range(self.reconnect_attempts):
-                try:
-                    self._close_socket()
-                    self.sock = self._create_socket()
-                    print("Успешное подключение сокета TCP")
-                    return True
-                except Exception as e:
-                    print(f"Попытка подключения сокета {attempt + 1}/{self.reconnect_attempts}: {e}")
-                    time.sleep(self.reconnect_delay)
-            return False
+            self._close_socket()
+            self.sock = sock
+            self._sock_timeout = self.read_timeout
+            self.reset_link_state()
+        self.liveness.touch()
+        self.liveness.start()
+        if self.connection.reconnects:
+            self.metrics.counter('reconnects').inc()
+        print("Успешное подключение сокета TCP")
+        return True
+
+    def reset_link_state(self):
+        """Сбрасывает состояние приема для нового соединения (и в асинхронном опросе)"""
+        self.framer.reset()
+        with self._pipeline_lock:
+            self.pipeline_failures = 0  # Отказы считаются заново на каждом соединении
+
+    def _connection_lost(self, reason):
+        """Закрывает сокет и передает переподключение в фоновый поток"""
+        if self.connection.connected:
+            self.liveness.report_dead(reason)
+        with self.connection_lock:
+            self._close_socket()
+        self.connection.mark_disconnected(reason)
+
+    def _heartbeat(self):
+        """Контрольное чтение статуса при простое канала"""
+        self.read_register_async(REG_STATUS, priority=PRIORITY_POLL).result()
+
+    def request_gap(self):
+        """Текущая пауза между запросами: фиксированная или адаптивная"""
+        return self.pacer.gap if self.adaptive_pacing else self.poll_delay
+
+    def record_timeout(self):
+        """Учитывает таймаут ответа в регуляторе темпа и метриках"""
+        self.pacer.record_error('timeout')
+        self.metrics.counter('timeouts').inc()
+
+    def _record_pacing(self, started, ok):
+        """Передает исход транзакции в адаптивный регулятор темпа и счетчики метрик"""
+        resyncs = self.framer.resync_count
+        if ok and resyncs == self._resyncs_seen:
+            self.pacer.record_success(time.monotonic() - started)
+        else:
+            self.pacer.record_error('reject')
+        if resyncs != self._resyncs_seen:
+            self.metrics.counter('frame_resyncs').inc(resyncs - self._resyncs_seen)
+            self._resyncs_seen = resyncs
+        crc_errors = self.framer.crc_errors
+        if crc_errors != self._crc_errors_seen:
+            self.metrics.counter('crc_errors').inc(crc_errors - self._crc_errors_seen)
+            self._crc_errors_seen = crc_errors
+
+    def _rtt_histogram(self, address):
+        """Гистограмма времени ответа регистра (кэшируется по адресу)"""
+        histogram = self._rtt_histograms.get(address)
+        if histogram is None:
+            histogram = self._rtt_histograms[address] = self.metrics.histogram(f"rtt_0x{address:02X}")
+        return histogram
+
+    def _set_timeout(self, timeout):
+        """Меняет таймаут сокета, только если он отличается от текущего"""
+        if timeout != self._sock_timeout:
+            self.sock.settimeout(timeout)
+            self._sock_timeout = timeout
 
     def _create_socket(self):
         """Создает и настраивает сокет"""
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.settimeout(self.read_timeout)
         sock.connect((self.ip, self.port))
+        configure_keepalive(sock)
         return sock
 
     def _close_socket(self):
@@ -70,167 +175,435 @@ class DeviceController:
             self.sock = None
 
     def _ensure_connection(self):
-        """Проверяет и восстанавливает соединение при необходимости"""
-        if self.sock is None:
-            return self._reconnect()
+        """Проверяет наличие соединения, не дожидаясь переподключения.
 
-        try:
-            self.sock.settimeout(1)
-            self.sock.sendall(b'')  # Тестовый пустой пакет
-            return True
-        except Exception:
-            return self._reconnect()
+        При отсутствии соединения запускает фоновое переподключение
+        и сразу возвращает False.
+        """
+        if self.sock is None or not self.connection.connected:
+            self.connection.request_reconnect()
+            return False
+        # Живость проверяется TCP keepalive и контрольными запросами
+        # при простое (LivenessMonitor), а не на каждом запросе
+        return True
 
-    def connect(self):
-        """Устанавливает первоначальное соединение"""
-        return self._reconnect()
+    def connect(self, timeout=None):
+        """Запускает подключение и ждет его не дольше timeout секунд.
+
+        При неудаче переподключение продолжается в фоне.
+        """
+        self.connection.request_reconnect()
+        return self.connection.wait_connected(self.read_timeout if timeout is None else timeout)
 
     def _build_frame(self, address, write=False, data=0x0000):
         """Собирает кадр согласно протоколу."""
-        byte1 = (
-                0xC0 |
-                (0x20 if write else 0x00) |
-                ((data >> 15) & 0x01) << 4 |
-                ((data >> 14) & 0x01) << 3 |
-                self.device_id
-        )
-        byte2 = address & 0x7F
-        byte3 = (data >> 7) & 0x7F
-        byte4 = data & 0x7F
-
-        frame = bytes([byte1, byte2, byte3, byte4])
-        crc = crc7_generate(frame)
-        return frame + bytes([crc & 0x7F])
+        return codec.encode(self.device_id, address, write=write, data=data)
 
     def _parse_response(self, response, expected_address):
         """Парсит ответное сообщение."""
-        if len(response) != 5:
-            return None
-        if (response[0] & 0xC0) != 0xC0:
-            return None
-        if (response[0] & 0x07) != self.device_id:
-            return None
-        if (response[1] & 0x7F) != expected_address:
-            return None
-        if crc7_generate(response[:4]) != (response[4] & 0x7F):
-            return None
-
-        return (
-                ((response[0] >> 4) & 0x03) << 14 |
-                (response[2] & 0x7F) << 7 |
-                response[3] & 0x7F
-        )
-
-    def read_register(self, address):
-        """Чтение регистра с автоматическим переподключением"""
-        for attempt in range(3):
+        value = codec.decode(response, self.device_id, expected_address)
+        if value is None:
+            self.metrics.counter('parse_rejects').inc()
+        return value
+
+    def encode_reads(self, addresses):
+        """Кадры запросов чтения регистров addresses одной посылкой"""
+        return b''.join(self._build_frame(addr, write=False) for addr in addresses)
+
+    def take_frames(self, addresses, frames, started):
+        """Переносит из буфера разборщика в frames ответы на addresses.
+
+        Общая часть приема для сокета и асинхронного опроса: вызывающий
+        передает принятые байты в framer.feed() и повторяет вызов, пока
+        не получит True (ответы на все адреса). Валидные кадры с неожиданным
+        адресом (ответы на другие запросы) пропускаются как устаревшие.
+        Время прихода каждого кадра от started (отправки запроса)
+        учитывается в гистограмме RTT его регистра.
+        """
+        frame = self.framer.next_frame()
+        while frame is not None:
+            address = frame[1] & 0x7F
+            if address in addresses and address not in frames:
+                frames[address] = frame
+                self._rtt_histogram(address).record(time.monotonic() - started)
+            else:
+                self.framer.stale_frames += 1
+                self.metrics.counter('stale_frames').inc()
+            frame = self.framer.next_frame()
+        return len(frames) == len(addresses)
+
+    def decode_frames(self, frames, addresses, started):
+        """Значения из принятых кадров {адрес: кадр}: {адрес: значение или None}.
+
+        Ответ на все addresses учитывается в регуляторе темпа.
+        """
+        values = {addr: self._parse_response(frame, addr) for addr, frame in frames.items()}
+        if len(values) == len(addresses):
+            self._record_pacing(started, None not in values.values())
+        return values
+
+    def _receive_frames(self, addresses, timeout, started, frames=None):
+        """Принимает из сокета по одному ответному кадру на каждый адрес из addresses.
+
+        Байты проходят через буферизованный разборщик (take_frames): мусор
+        и сдвиг выравнивания отбрасываются без разрыва соединения.
+        Возвращает словарь {адрес: кадр} (frames, если он передан);
+        при истечении таймаута выбрасывает socket.timeout, уже принятые
+        кадры при этом остаются в frames.
+        """
+        deadline = time.monotonic() + timeout
+        if frames is None:
+            frames = {}
+        received = False
+        while not self.take_frames(addresses, frames, started):
+            if received:
+                # Ответ пришел частями: оставшееся время ожидания сокращается
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout(f"Таймаут ответа ({len(frames)}/{len(addresses)} кадров)")
+                self._set_timeout(remaining)
+            chunk = self.sock.recv(FRAME_SIZE * (len(addresses) - len(frames)))
+            if not chunk:
+                raise ConnectionError("Соединение закрыто устройством")
+            self.framer.feed(chunk)
+            received = True
+        self.liveness.touch()
+        return frames
+
+    def _discard_late_replies(self):
+        """Отбрасывает ответы, пришедшие после таймаута, перед повтором запроса.
+
+        Запоздавший ответ с тем же адресом неотличим от ответа на повтор,
+        поэтому все, что пришло в течение LATE_REPLY_WINDOW, вычитывается
+        из сокета и учитывается как устаревшие кадры, а буфер разборщика
+        очищается.
+        """
+        self._set_timeout(LATE_REPLY_WINDOW)
+        try:
+            while True:
+                chunk = self.sock.recv(4096)
+                if not chunk:
+                    raise ConnectionError("Соединение закрыто устройством")
+                self.framer.feed(chunk)
+        except socket.timeout:
+            pass
+        self.discard_buffered_frames()
+
+    def discard_buffered_frames(self):
+        """Учитывает оставшиеся в разборщике кадры как устаревшие и очищает его буфер"""
+        stale = 0
+        while self.framer.next_frame() is not None:
+            stale += 1
+        if stale:
+            self.framer.stale_frames += stale
+            self.metrics.counter('stale_frames').inc(stale)
+        self.framer.reset()
+
+    def _read_register_io(self, address):
+        """Чтение регистра с автоматическим переподключением (в потоке ввода-вывода)"""
+        for attempt in range(self.request_retries):
+            if not self._ensure_connection():
+                break
             try:
-                if not self._ensure_connection():
-                    continue
-
+                if attempt:
+                    self._discard_late_replies()
                 request = self._build_frame(address, write=False)
-                self.sock.settimeout(self.read_timeout)
+                self._set_timeout(self.read_timeout)
+                started = time.monotonic()
                 self.sock.sendall(request)
-                response = self.sock.recv(5)
-
-                if not response:
-                    raise socket.timeout("Пустой ответ от устройства")
-
-                return self._parse_response(response, address)
-
-            except (socket.timeout, socket.error, ConnectionError) as e:
+                frames = self._receive_frames([address], self.read_timeout, started)
+                return self.decode_frames(frames, [address], started)[address]
+
+            except socket.timeout as e:
+                # Ответ мог потеряться: повторяем на том же соединении,
+                # предварительно отбросив запоздавшие ответы
+                self.record_timeout()
+                print(f"Таймаут ответа (попытка {attempt + 1}): {e}")
+                if attempt == self.request_retries - 1:
+                    self._connection_lost(e)
+                else:
+                    self.metrics.counter('retries').inc()
+            except (socket.error, ConnectionError) as e:
                 print(f"Ошибка связи сокета (попытка {attempt + 1}): {e}")
-                self.sock = None
-                if not self._reconnect():
-                    continue
+                self._connection_lost(e)
+                break
             except Exception as e:
                 print(f"Ошибка чтения регистра 0x{address:02X}: {e}")
                 break
 
         return None
 
-    def write_register(self, address, value):
-        """Запись регистра с автоматическим переподключением"""
-        for attempt in range(3):
+    def _write_register_io(self, address, value):
+        """Запись регистра с автоматическим переподключением (в потоке ввода-вывода)"""
+        for attempt in range(self.request_retries):
+            if not self._ensure_connection():
+                break
             try:
-                if not self._ensure_connection():
-                    continue
-
+                if attempt:
+                    self._discard_late_replies()
                 request = self._build_frame(address, write=True, data=value)
-                self.sock.settimeout(self.write_timeout)
+                self._set_timeout(self.write_timeout)
+                started = time.monotonic()
                 self.sock.sendall(request)
-                response = self.sock.recv(5)
-
-                if not response:
-                    raise socket.timeout("Пустой ответ")
-
-                return self._parse_response(response, address) is not None
-
-            except (socket.timeout, socket.error, ConnectionError) as e:
+                frames = self._receive_frames([address], self.write_timeout, started)
+                return self.decode_frames(frames, [address], started)[address] is not None
+
+            except socket.timeout as e:
+                # Ответ мог потеряться: повторяем на том же соединении,
+                # предварительно отбросив запоздавшие ответы
+                self.record_timeout()
+                print(f"Таймаут ответа (попытка {attempt + 1}): {e}")
+                if attempt == self.request_retries - 1:
+                    self._connection_lost(e)
+                else:
+                    self.metrics.counter('retries').inc()
+            except (socket.error, ConnectionError) as e:
                 print(f"Ошибка связи сокета (попытка {attempt + 1}): {e}")
-                self.sock = None
-                if not self._reconnect():
-                    continue
+                self._connection_lost(e)
+                break
             except Exception as e:
                 print(f"Ошибка записи регистра 0x{address:02X}: {e}")
                 break
 
         return False
 
+    def _read_registers_io(self, addresses):
+        """Конвейерное чтение нескольких регистров (в потоке ввода-вывода).
+
+        Запросы отправляются одним sendall, затем принимаются N ответных
+        кадров с общим таймаутом на пакет. Ответы сопоставляются по адресу.
+        Возвращает словарь {адрес: значение} (значение None при ошибке
+        разбора) только для пришедших ответов - если часть кадров потеряна
+        (помехи, ошибки CRC), соединение сохраняется, а недостающие регистры
+        вызывающий дочитывает по одному. None - если связи нет или
+        соединение разорвано.
+        """
+        if not self._ensure_connection():
+            return None
+
+        request = self.encode_reads(addresses)
+        frames = {}
+        try:
+            self._set_timeout(self.batch_timeout)
+            started = time.monotonic()
+            self.sock.sendall(request)
+            try:
+                self._receive_frames(addresses, self.batch_timeout, started, frames)
+            except socket.timeout as e:
+                self.record_timeout()
+                print(f"Конвейерное чтение: {e}")
+                # Недополученные ответы не должны попасть в последующие чтения
+                self._discard_late_replies()
+        except (socket.error, ConnectionError) as e:
+            print(f"Ошибка конвейерного чтения: {e}")
+            self._connection_lost(e)
+            return None
+
+        return self.decode_frames(frames, addresses, started)
+
+    def read_register_async(self, address, priority=PRIORITY_COMMAND):
+        """Ставит чтение регистра в очередь ввода-вывода, возвращает Future"""
+        return self.io.submit(self._read_register_io, address, priority=priority)
+
+    def write_register_async(self, address, value, priority=PRIORITY_COMMAND):
+        """Ставит запись регистра в очередь ввода-вывода, возвращает Future"""
+        return self.io.submit(self._write_register_io, address, value, priority=priority)
+
+    def read_registers_async(self, addresses, priority=PRIORITY_COMMAND):
+        """Ставит конвейерное чтение в очередь ввода-вывода, возвращает Future"""
+        return self.io.submit(self._read_registers_io, addresses, priority=priority)
+
+    def read_register(self, address):
+        """Чтение регистра (блокирует до завершения транзакции)"""
+        return self.read_register_async(address).result()
+
+    def write_register(self, address, value):
+        """Запись регистра (блокирует до завершения транзакции)"""
+        return self.write_register_async(address, value).result()
+
+    def read_registers(self, addresses):
+        """Конвейерное чтение нескольких регистров (блокирует до завершения)"""
+        return self.read_registers_async(addresses).result()
+
+    def record_pipeline(self, batch, serial):
+        """Учитывает исход конвейерного пакета (и в асинхронном опросе).
+
+        batch - ответы пакета (None - связь потеряна), serial - значения
+        регистров, дочитанных затем по одному. Отказом считается только пакет
+        без единого ответа, когда те же регистры по одному читаются успешно:
+        потеря части кадров (помехи на линии) и обрыв связи - не признак того,
+        что прошивка не держит очередь запросов. После PIPELINE_MAX_FAILURES
+        отказов подряд конвейерный режим отключается.
+
+        Вызывается из потоков опроса и серии измерений (start_burst),
+        поэтому счетчик и режим меняются под блокировкой.
+        """
+        if batch is None or (not batch and (not serial or None in serial.values())):
+            return
+        with self._pipeline_lock:
+            if batch:
+                self.pipeline_failures = 0
+                return
+            self.pipeline_failures += 1
+            disable = self.pipelined and self.pipeline_failures >= PIPELINE_MAX_FAILURES
+            if disable:
+                self.pipelined = False
+        self.metrics.counter('pipeline_failures').inc()
+        if disable:
+            print("Конвейерное чтение не поддерживается устройством, "
+                  "переход в последовательный режим")
+
+    def _read_cycle(self, addresses):
+        """Читает регистры (конвейерно или по одному): {адрес: значение или None}.
+
+        Регистры, на которые конвейерный пакет не получил ответа, дочитываются по одному.
+        """
+        pipelined = self.pipelined and len(addresses) > 1
+        batch = None
+        if pipelined:
+            batch = self.read_registers_async(addresses, priority=PRIORITY_POLL).result()
+        values = dict(batch or {})
+        serial = {}
+        for addr in [addr for addr in addresses if addr not in values]:
+            if values or serial:
+                time.sleep(self.request_gap())
+            serial[addr] = self.read_register_async(addr, priority=PRIORITY_POLL).result()
+        if pipelined:
+            self.record_pipeline(batch, serial)
+        values.update(serial)
+        return values
+
+    def _poll_registers(self, addresses):
+        """Читает регистры и публикует отсчет"""
+        started = time.monotonic()
+        values = self._read_cycle(addresses)
+        self._poll_cycle_histogram.record(time.monotonic() - started)
+        self._publish_sample(values)
+
+    def mark_polling_started(self):
+        """Отмечает начало опроса по расписанию (и в асинхронном опросе)"""
+        self.start_polling_time = time.time()
+        self._last_poll_report = time.monotonic()
+
+    def complete_cycle(self, addresses, values, started):
+        """Завершает цикл опроса по расписанию (и в асинхронном опросе).
+
+        Публикует отсчет values (None - цикл прерван ошибкой), отмечает
+        регистры addresses выполненными в планировщике, передает период
+        данных и не чаще poll_stats_interval - статистику опроса.
+        """
+        if values is not None:
+            self._poll_cycle_histogram.record(time.monotonic() - started)
+            self._publish_sample(values)
+        self.scheduler.complete(addresses, now=started)
+
+        if REG_STATUS in addresses:
+            period = int((time.time() - self.start_polling_time) * 1000)
+            self.start_polling_time = time.time()
+            if self.func_calc_time is not None:
+                self.func_calc_time(period)
+
+        if self.func_poll_stats is not None and started - self._last_poll_report >= self.poll_stats_interval:
+            self._last_poll_report = started
+            self.func_poll_stats(self.scheduler.report())
+
+    def start_burst(self, count=None, duration=None, on_progress=None, on_done=None):
+        """Запускает в фоне серию из count отсчетов (или за duration секунд).
+
+        Все опрашиваемые регистры читаются циклами подряд с паузой текущего
+        темпа канала, независимо от того, идет ли опрос по расписанию.
+        Отсчеты серии не попадают в буфер samples. Возвращает BurstCapture
+        (future - массив отсчетов SAMPLE_DTYPE); обратные вызовы выполняются
+        в потоке серии.
+        """
+        addresses = list(POLLED_REGISTERS)
+        return BurstCapture(
+            lambda: self._read_cycle(addresses), count=count, duration=duration,
+            gap=self.request_gap, on_progress=on_progress, on_done=on_done
+        ).start()
+
+    def set_poll_periods(self, periods):
+        """Задает периоды опроса регистров: {адрес: период в секундах или None}"""
+        self.scheduler.set_periods(periods)
+
+    def request_poll(self, *addresses):
+        """Внеочередное чтение регистров (например, опрашиваемых только по запросу)"""
+        self.scheduler.request(*addresses)
+
     def start_polling(self, one_poll=False):
-        def polling_loop(one_poll=False):
-            polling_config = [
-                (REG_STATUS, self.status_queue),
-                (REG_MEASURED_PRESSURE, self.measured_pressure_queue),
-                (REG_TEMPERATURE, self.temperature_queue),
-                (REG_POSITION_LO, self.position_queue_LO),
-                (REG_POSITION_HI, self.position_queue_HI),
-            ]
-
-            def poll():
+        """Запускает опрос регистров по расписанию планировщика.
+
+        При one_poll=True все регистры читаются однократно в текущем потоке.
+        """
+        def polling_loop():
+            while self.running:
+                due, wait = self.scheduler.due()
+                if not due:
+                    self.scheduler.wakeup.wait(wait)
+                    continue
+
+                started = time.monotonic()
                 try:
-                    for addr, queue in polling_config:
-                        value = self.read_register(addr)
-                        if queue.full():
-                            queue.get()
-                        if value is not None:
-                            queue.put((addr, value))
-                        time.sleep(0.05)
+                    values = self._read_cycle(due)
                 except Exception as e:
                     print(f"[polling_loop] Ошибка в цикле: {e}")
+                    values = None
+                self.complete_cycle(due, values, started)
 
-            if one_poll:
-                poll()
-                return
-
-            while self.running:
-                poll()
-                period = int((time.time() - self.start_polling_time) * 1000)
-                self.start_polling_time = time.time()
-                if self.func_calc_time is not None:
-                    self.func_calc_time(period)
+                # Минимальный интервал между началами запросов к устройству
+                gap = self.request_gap() - (time.monotonic() - started)
+                if gap > 0:
+                    time.sleep(gap)
 
         if one_poll:
-            polling_loop(one_poll=True)
+            self._poll_registers(list(POLLED_REGISTERS))
+            return
+
         if self.running:
             self.start_polling_time = time.time()
             return
 
-        if not one_poll:
-            self.running = True
-
+        self.mark_polling_started()
+        self.running = True
         self.t = threading.Thread(target=polling_loop, daemon=True)
         self.t.start()
 
     def stop_polling(self):
         """Останавливает опрос данных"""
         self.running = False
+        self.scheduler.wakeup.set()
 
     def init_func_time_culc(self, func):
         self.func_calc_time = func
 
-    def disconnect(self):
-        """Закрывает соединение"""
+    def init_new_sample(self, func):
+        """Подписывает func() на публикацию нового отсчета в samples.
+
+        Вызывается из потока опроса после каждого отсчета, поэтому должна
+        быть быстрой и только будить потребителя (например, окно).
+        """
+        self.func_new_sample = func
+
+    def init_poll_stats(self, func):
+        """Подписывает func(отчет) на статистику опроса по регистрам.
+
+        Отчет - словарь {адрес: {'rate_hz', 'target_hz', 'jitter_ms', ...}},
+        передается не чаще раза в poll_stats_interval секунд из потока опроса.
+        """
+        self.func_poll_stats = func
+
+    def disconnect(self, timeout=None):
+        """Закрывает соединение
+
+        :param timeout: ожидание каждого фонового потока, с (None - без ограничения)
+        """
         self.stop_polling()
+        if self.t.is_alive() and self.t is not threading.current_thread():
+            self.t.join(timeout)  # Последний цикл опроса не должен заново запустить потоки ниже
+        # Сначала останавливается переподключение: иначе оно может открыть сокет
+        # и запустить контроль живости уже после их остановки
+        self.connection.stop(timeout)
+        self.liveness.stop(timeout)
+        self.io.stop(timeout)
         with self.connection_lock:
             self._close_socket()
\ No newline at end of file
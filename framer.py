@@ -0,0 +1,59 @@
+"""Модуль буферизованного разбора потока 5-байтовых кадров"""
+
+from crc import crc7_generate
+
+FRAME_SIZE = 5
+FRAME_MARKER = 0xC0
+
+
+class FrameReader:
+    """Накапливает байты из сокета и выделяет из них выровненные кадры.
+
+    Кадр считается найденным, если у первого байта установлены маркерные
+    биты 0xC0 и совпадает CRC7. При несовпадении разборщик сдвигается
+    до следующего кандидата с маркером, отбрасывая мусор, - соединение
+    при этом не разрывается.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.resync_count = 0  # Число событий потери синхронизации
+        self.discarded_bytes = 0  # Всего отброшено байт мусора
+        self.stale_frames = 0  # Валидные кадры, не ожидавшиеся получателем
+        self.crc_errors = 0  # Кандидаты с маркером, но неверной CRC7
+        self._in_sync = True
+
+    def reset(self):
+        """Сбрасывает буфер (например, после переподключения)"""
+        self.buffer.clear()
+        self._in_sync = True
+
+    def feed(self, data):
+        """Добавляет принятые байты в буфер"""
+        self.buffer += data
+
+    def _discard(self, count):
+        del self.buffer[:count]
+        self.discarded_bytes += count
+        if self._in_sync:
+            self._in_sync = False
+            self.resync_count += 1
+
+    def next_frame(self):
+        """Возвращает следующий валидный кадр или None, если данных недостаточно"""
+        buffer = self.buffer
+        while len(buffer) >= FRAME_SIZE:
+            if (buffer[0] & FRAME_MARKER) == FRAME_MARKER:
+                if crc7_generate(buffer[:4]) == (buffer[4] & 0x7F):
+                    frame = bytes(buffer[:FRAME_SIZE])
+                    del buffer[:FRAME_SIZE]
+                    self._in_sync = True
+                    return frame
+                self.crc_errors += 1
+
+            # Ищем следующий байт с маркерными битами
+            skip = 1
+            while skip < len(buffer) and (buffer[skip] & FRAME_MARKER) != FRAME_MARKER:
+                skip += 1
+            self._discard(skip)
+        return None
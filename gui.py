@@ -1,39 +1,83 @@
 """Модуль графического интерфейса"""
 
+import collections
+import threading
 import time
-import matplotlib
-from datetime import datetime
 from tkinter import Tk, BooleanVar, StringVar, IntVar, Menu
 from tkinter import ttk
 from tkinter import scrolledtext
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from collections import deque
 from logger import DataLogger  # Добавляем импорт
+from history import HistoryStore
+from plotting import minmax_decimate, hysteresis_limits
+from viewmodel import ViewModel
+from console import Console
+from connection import STATE_CONNECTED, STATE_CONNECTING, STATE_DISCONNECTED
+from metrics import dump_metrics
+from sample_buffer import FIELD_STATUS, FIELD_PRESSURE, FIELD_TEMPERATURE, FIELD_POSITION
 from constants import (
     REG_STATUS, REG_TEMPERATURE, REG_MEASURED_PRESSURE,
     REG_POSITION_LO, REG_POSITION_HI, REG_COMMAND, REG_SET_PRESSURE, REG_SET_POSITION,
     CMD_START, CMD_STOP, CMD_SAVE_FLASH, CMD_OPEN, CMD_CLOSE, CMD_MIDDLE_POSITION, CMD_POSITION,
-    CMD_SOUND
+    CMD_SOUND, GRAPHS_SOURCE_POINTS, CONSOLE_MAX_LINES
 )
 
-matplotlib.rcParams['path.simplify'] = True
-matplotlib.rcParams['path.simplify_threshold'] = 1.0
-matplotlib.rcParams['agg.path.chunksize'] = 10000
-matplotlib.use('TkAgg')  # Явно указываем бэкенд
+GRAPHS_DELAY_MS = 50  # Задержка создания графиков после открытия окна
+GRAPHS_FPS = 30  # Максимальная частота перерисовки графиков, кадров/с
+GUI_REFRESH_HZ = 60  # Максимальная частота обновления окна по новым данным
+GUI_IDLE_TICK_MS = 100  # Максимальный период проверки новых данных при их отсутствии
+GUI_SHUTDOWN_TIMEOUT = 10.0  # Ожидание остановки фоновых потоков при закрытии окна, с
+# Интервалы графиков: название -> (длительность, с; единица оси времени, с; подпись единицы)
+GRAPH_SPANS = {
+    "1 мин": (60, 1, "с"),
+    "1 час": (3600, 60, "мин"),
+    "1 сутки": (86400, 3600, "ч"),
+}
+
+
+def _load_matplotlib():
+    """Импортирует matplotlib при первом показе графиков (долгий импорт)"""
+    import matplotlib
+    matplotlib.rcParams['path.simplify'] = True
+    matplotlib.rcParams['path.simplify_threshold'] = 1.0
+    matplotlib.rcParams['agg.path.chunksize'] = 10000
+    matplotlib.use('TkAgg')  # Явно указываем бэкенд
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    return Figure, FigureCanvasTkAgg
+
 
 class DeviceGUI:
     """Класс графического интерфейса для управления устройством"""
 
-    def __init__(self, controller):
+    def __init__(self, controller, startup_timer=None, console_max_lines=CONSOLE_MAX_LINES, console_log=None):
+        """
+        :param console_max_lines: строк в окне вывода команд
+        :param console_log: файл-копия окна вывода команд (с ротацией), None - без копии
+        """
         self.controller = controller
+        self.startup_timer = startup_timer
+        self.console = Console(max_lines=console_max_lines, mirror_path=console_log)
+        self.metrics = controller.metrics  # Общий реестр контроллера, лога и окна
+        self._tick_histogram = self.metrics.histogram('gui_tick')
         self.window = Tk()
         self._setup_window()
         self._init_variables()
         self._setup_ui()
+        self.logger = DataLogger(  # Создаем экземпляр логгера
+            log_interval=60, device=controller.log_name, metrics=self.metrics
+        )
         self._start_background_tasks()
-        self.logger = DataLogger(log_interval=60)  # Создаем экземпляр логгера
         self.controller.init_func_time_culc(self._update_interval_upd_data)
+        self.controller.init_poll_stats(self._set_poll_report)
+        self._connection_listener = lambda state: self._call_soon(self._show_connection_state, state)
+        self.controller.connection.add_listener(self._connection_listener)
+        self._show_connection_state(self.controller.connection.state)
+        self.window.after(0, self._mark_startup, "окно")
+
+    def _mark_startup(self, stage):
+        """Отмечает этап запуска для отчета о времени запуска"""
+        if self.startup_timer is not None:
+            self.startup_timer.mark(stage)
 
     def _setup_window(self):
         """Настройка основного окна"""
@@ -66,19 +110,47 @@ class DeviceGUI:
         self.receive_new_pressure_data = False
         self.receive_new_position_data = False
         self.receive_new_status_data = False
-        self.last_log_time = time.time()
+        self.sample_seq = 0  # Номер следующего непрочитанного отсчета
+        self._init_tick_state()
         self.calc_speed = False
         self.text_press = "Давление"
         self.log_enable = BooleanVar(value=False)
+        self.burst = None  # Текущая серия измерений (BurstCapture)
+        self.burst_var = StringVar(value="")
         self.interval_polling = StringVar(value="Обновление окна: ---мс")
         self.interval_upd_data = StringVar(value="Обновление данных: ---мс")
+        self.connection_state_var = StringVar(value="Связь: ---")
+        self.poll_stats_var = StringVar(value="")
+
+        # Показания из отсчетов попадают в Tk через модель представления:
+        # только изменившиеся значения, один раз за обновление окна
+        self.view = ViewModel()
+        for name, var in self.status_vars.items():
+            self.view.bind(name, var)
+        self.view.bind('temperature', self.temperature_var, lambda v: f"{v / 10.0:.1f} °C")
+        self.view.bind('pressure', self.measured_pressure_var, lambda v: f"{v / 10.0:.1f} Pa")
+        self.view.bind('position', self.position_var)
+        self.view.bind('position', self.position_text_var, lambda v: f"Позиция изм.: {v}")
+        self.view.bind('data_interval', self.interval_upd_data, lambda v: f"Обновление данных: {v}мс")
+        self.view.bind('tick_ms', self.interval_polling, lambda v: f"Обновление окна: {v:.1f}мс")
+
+        # История для графиков (копится и до создания графиков)
+        self.history = HistoryStore()
+        self.graph_span = StringVar(value=next(iter(GRAPH_SPANS)))
+        self.canvas = None  # Создается после открытия окна
+
+    def _init_tick_state(self):
+        """Состояние цикла обновления окна (_tick_loop)"""
+        self._wake = threading.Event()  # Есть новые данные (устанавливается из любого потока)
+        self._tick_after = None  # Идентификатор запланированного _tick_loop
+        self._tick_delay = GUI_IDLE_TICK_MS  # Текущий период проверки, мс
+        self._data_interval = None  # Период обновления данных от потока опроса, мс
+        self._poll_report = None  # Последняя статистика опроса от потока опроса
+        self._calls = collections.deque()  # Вызовы из фоновых потоков для выполнения в потоке Tk
+        self._closing = False
 
     def _init_graphs(self, frame):
-        # Данные для графиков
-        self.max_points = 100  # Фиксированное количество точек
-        self.temp_data = {'time': deque(maxlen=self.max_points), 'value': deque(maxlen=self.max_points)}
-        self.pressure_data = {'time': deque(maxlen=self.max_points), 'value': deque(maxlen=self.max_points)}
-        self.position_data = {'time': deque(maxlen=self.max_points), 'value': deque(maxlen=self.max_points)}
+        Figure, FigureCanvasTkAgg = _load_matplotlib()
 
         # Настройка фигуры
         self.fig = Figure(figsize=(6, 5), dpi=80)
@@ -89,33 +161,52 @@ class DeviceGUI:
         self.ax2 = self.fig.add_subplot(312)
         self.ax3 = self.fig.add_subplot(313)
 
-        # Инициализация линий графиков
-        self.temp_line, = self.ax1.plot([], [], 'r-', label='Температура')
-        self.pressure_line, = self.ax2.plot([], [], 'b-', label='Давление')
-        self.position_line, = self.ax3.plot([], [], 'g-', label='Позиция')
+        # Инициализация линий графиков (рисуются поверх сохраненного фона)
+        self.temp_line, = self.ax1.plot([], [], 'r-', label='Температура', animated=True)
+        self.pressure_line, = self.ax2.plot([], [], 'b-', label='Давление', animated=True)
+        self.position_line, = self.ax3.plot([], [], 'g-', label='Позиция', animated=True)
+        self.graph_lines = ((self.temp_line, self.ax1, 'temperature'),
+                            (self.pressure_line, self.ax2, 'pressure'),
+                            (self.position_line, self.ax3, 'position'))
 
         # Настройка осей
         self.ax1.set_title('Температура (°C)')
-        self.ax1.set_xlim(0, self.max_points - 1)
         self.ax1.grid(True)
         self.ax1.legend(loc='upper right')
         self.ax2.set_title('Давление (Pa)')
-        self.ax2.set_xlim(0, self.max_points - 1)
         self.ax2.grid(True)
         self.ax2.legend(loc='upper right')
         self.ax3.set_title('Позиция')
-        self.ax3.set_xlim(0, self.max_points - 1)
         self.ax3.grid(True)
         self.ax3.legend(loc='upper right')
+        self._set_time_axis()
+
+        # Фон для blitting сохраняется при каждой полной отрисовке (_on_draw)
+        self.ax1_background = None
+        self.ax2_background = None
+        self.ax3_background = None
+        self.last_render = 0.0
 
         # Инициализация canvas
         self.canvas = FigureCanvasTkAgg(self.fig, master=frame)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
         self.canvas.draw()
 
-        # Фон для blitting нужно сохранять после первого отображения
+    def _set_time_axis(self):
+        """Настраивает ось времени графиков под выбранный интервал"""
+        span, unit, unit_name = GRAPH_SPANS[self.graph_span.get()]
+        for ax in (self.ax1, self.ax2, self.ax3):
+            ax.set_xlim(-span / unit, 0)
+        self.ax3.set_xlabel(f"Время, {unit_name}")
+
+    def _on_span_changed(self, event=None):
+        """Переключает интервал графиков (полная перерисовка с новой осью времени)"""
+        if self.canvas is None:
+            return
+        self._set_time_axis()
         self.ax1_background = None
-        self.ax2_background = None
-        self.ax3_background = None
+        self.receive_new_temperature_data = True
+        self._request_tick()
 
     def _setup_ui(self):
         """Создание элементов интерфейса"""
@@ -161,167 +252,157 @@ class DeviceGUI:
         self.command_output.bind("<Key>", lambda e: "break")
         # Добавляем контекстное меню
         self._add_context_menu(self.command_output)
+        self.console.widget = self.command_output
 
     def _create_graphs_frame(self, parent):
         """Создает фрейм с графиками"""
         frame = ttk.LabelFrame(parent, text="Графики в реальном времени", padding="5")
         frame.pack(fill='both', expand=True, pady=5)
 
-        # Убедимся, что фигура уже создана
-        if not hasattr(self, 'canvas'):
+        toolbar = ttk.Frame(frame)
+        toolbar.pack(fill='x')
+        ttk.Label(toolbar, text="Интервал:").pack(side='left', padx=5)
+        span_box = ttk.Combobox(toolbar, textvariable=self.graph_span, values=list(GRAPH_SPANS),
+                                state='readonly', width=10)
+        span_box.pack(side='left')
+        span_box.bind("<<ComboboxSelected>>", self._on_span_changed)
+
+        # matplotlib загружается после открытия окна, чтобы не задерживать запуск
+        placeholder = ttk.Label(frame, text="Загрузка графиков...")
+        placeholder.pack(expand=True)
+        self.window.after(GRAPHS_DELAY_MS, self._show_graphs, frame, placeholder)
+
+    def _show_graphs(self, frame, placeholder):
+        """Создает графики (первый импорт matplotlib)"""
+        try:
             self._init_graphs(frame)
+        except Exception as e:
+            placeholder.configure(text=f"Графики недоступны: {e}")
+            return
+        placeholder.destroy()
 
         # Размещаем canvas так, чтобы он занимал всё пространство фрейма
         self.canvas.get_tk_widget().pack(fill='both', expand=True)
 
-        # Подключаем событие отрисовки
-        self.canvas.mpl_connect('draw_event', self._on_draw)
+        # Показать данные, накопленные до создания графиков
+        self.receive_new_temperature_data = True
+        self.receive_new_pressure_data = True
+        self.receive_new_position_data = True
+        self._request_tick()
+        self._mark_startup("графики")
 
     def _on_draw(self, event):
-        """Обработчик события отрисовки для сохранения фона"""
+        """Сохраняет фон всех осей после полной отрисовки и рисует поверх него линии.
+
+        Анимированные линии при полной отрисовке (в том числе при изменении
+        размера окна) не рисуются, поэтому они добавляются здесь же.
+        """
         self.ax1_background = self.canvas.copy_from_bbox(self.ax1.bbox)
         self.ax2_background = self.canvas.copy_from_bbox(self.ax2.bbox)
+        self.ax3_background = self.canvas.copy_from_bbox(self.ax3.bbox)
+        for line, ax, _ in self.graph_lines:
+            ax.draw_artist(line)
 
-    def _update_status(self):
-        """Обновляет статусные флаги"""
-        while not self.controller.status_queue.empty():
-            address, value = self.controller.status_queue.get()
-            if address == REG_STATUS:
-                for i, (name, var) in enumerate(self.status_vars.items()):
-                    var.set(bool(value & (1 << i)))
+    def _update_status(self, batch):
+        """Обновляет статусные флаги по последнему отсчету"""
+        if not (batch['valid'][-1] & FIELD_STATUS):
+            return
+        value = int(batch['status'][-1])
+        for i, name in enumerate(self.status_vars):
+            self.view.set(name, bool(value & (1 << i)))
 
-    def _update_position(self):
+    def _update_position(self, batch):
         """Обновляет позицию заслонки (32-битное значение)"""
-        position_lo = None
-        position_hi = None
-
-        while not self.controller.position_queue_LO.empty() and not self.controller.position_queue_HI.empty():
-            address, value = self.controller.position_queue_LO.get()
-            position_lo = value
-            address, value = self.controller.position_queue_HI.get()
-            position_hi = value
-
-        if position_lo is not None and position_hi is not None:
-            position = (position_hi << 16) | position_lo
-            self.position_var.set(position)
-            self.position_data['value'].append(position)
-            self.position_text_var.set(f"Позиция изм.: {position}")
-
-            self.receive_new_position_data = True
-            #print(f'pos_lo: {position_lo}, pos_hi: {position_hi}, pos: {position}')
+        fresh = batch['position'][(batch['fresh'] & FIELD_POSITION) != 0]
+        if not len(fresh):
+            return
+        self.view.set('position', int(fresh[-1]))
+        self.receive_new_position_data = True
 
-    def _update_temperature(self):
+    def _update_temperature(self, batch):
         """Обновляет показания температуры"""
-        max_updates = 10  # Ограничиваем количество обновлений за один вызов
-        updates = 0
+        fresh = batch['temperature'][(batch['fresh'] & FIELD_TEMPERATURE) != 0]
+        if not len(fresh):
+            return
+        self.view.set('temperature', int(fresh[-1]))
+        self.receive_new_temperature_data = True
 
-        while not self.controller.temperature_queue.empty() and updates < max_updates:
-            try:
-                address, value = self.controller.temperature_queue.get_nowait()
-                if address == REG_TEMPERATURE:
-                    temp_c = value / 10.0
-                    self.temp_data['value'].append(temp_c)
-                    self.temperature_var.set(f"{temp_c:.1f} °C")
-                    self.receive_new_temperature_data = True
-                    updates += 1
-            except:
-                break
-
-    def _update_pressure(self):
+    def _update_pressure(self, batch):
         """Обновляет показания давления"""
-        max_updates = 10
-        updates = 0
-
-        while not self.controller.measured_pressure_queue.empty() and updates < max_updates:
-            try:
-                address, value = self.controller.measured_pressure_queue.get_nowait()
-                if address == REG_MEASURED_PRESSURE:
-                    pressure = value / 10.0
-                    self.pressure_data['value'].append(pressure)
-                    self.measured_pressure_var.set(f"{pressure:.1f} Pa")
-                    self.receive_new_pressure_data = True
-                    updates += 1
-            except:
-                break
-
+        fresh = batch['pressure'][(batch['fresh'] & FIELD_PRESSURE) != 0]
+        if not len(fresh):
+            return
+        self.view.set('pressure', int(fresh[-1]))
+        self.receive_new_pressure_data = True
 
     def _update_data(self):
-        """Обновляет все данные из очередей"""
+        """Обновляет все данные из буфера отсчетов"""
         try:
-            self._update_status()
-            self._update_temperature()
-            self._update_position()
-            self._update_pressure()
+            batch, self.sample_seq, _ = self.controller.samples.read(self.sample_seq)
+            if not len(batch):
+                return
+            self._mark_startup("первый отсчет")
+            self.history.add(batch)
+            self._update_status(batch)
+            self._update_temperature(batch)
+            self._update_position(batch)
+            self._update_pressure(batch)
         except Exception as e:
             self.append_command_log(f"Ошибка обновления интерфейса: {e}")
 
     def _update_graphs(self):
-        """Оптимизированное обновление графиков"""
-        if not (self.receive_new_temperature_data or self.receive_new_pressure_data):
+        """Обновление графиков не чаще GRAPHS_FPS кадров в секунду.
+
+        Точки берутся из уровня истории, подходящего под выбранный интервал,
+        и прореживаются по min/max до ширины оси в пикселях, поэтому время
+        кадра не зависит от частоты опроса. Пределы Y меняются с гистерезисом;
+        полная перерисовка нужна только при их изменении, иначе обновляются
+        лишь линии поверх сохраненного фона.
+        """
+        if self.canvas is None:
+            return  # Графики еще не созданы, данные копятся в истории
+        if not (self.receive_new_temperature_data or self.receive_new_pressure_data
+                or self.receive_new_position_data):
             return
+        started = time.monotonic()
+        if started - self.last_render < 1.0 / GRAPHS_FPS:
+            return  # Флаги новых данных сохраняются до следующего кадра
+        self.last_render = started
 
         try:
-            redraw_full = False
-            # Обновляем данные линий
-            if self.receive_new_temperature_data and len(self.temp_data['value']) > 0:
-                self.temp_line.set_data(range(len(self.temp_data['value'])), self.temp_data['value'])
-                old_ylim = self.ax1.get_ylim()
-                self.ax1.relim()
-                self.ax1.autoscale_view(scalex=False, scaley=True)
-                new_ylim = self.ax1.get_ylim()
-                # Проверяем: изменились ли границы Y
-                if old_ylim != new_ylim:
-                    redraw_full = True
+            redraw_full = self.ax1_background is None
+            # Ось времени сдвигается с каждым кадром, поэтому обновляются все линии
+            span, unit, _ = GRAPH_SPANS[self.graph_span.get()]
+            now = time.time()
+            window = self.history.window(span, now=now, max_points=GRAPHS_SOURCE_POINTS)
+            for line, ax, name in self.graph_lines:
+                data = window[name]
+                if not len(data['t']):
+                    continue
+                if window['resolution'] == 0:
+                    low = high = data['mean']  # Сырые отсчеты: min = max = значение
                 else:
-                    redraw_full = False
-
-            if self.receive_new_pressure_data and len(self.pressure_data['value']) > 0:
-                self.pressure_line.set_data(range(len(self.pressure_data['value'])), self.pressure_data['value'])
-                old_ylim = self.ax2.get_ylim()
-                self.ax2.relim()
-                self.ax2.autoscale_view(scalex=False, scaley=True)
-                new_ylim = self.ax2.get_ylim()
-                # Проверяем: изменились ли границы Y
-                if old_ylim != new_ylim:
+                    low, high = data['min'], data['max']
+                x0, x1 = ax.get_xlim()
+                x, y = minmax_decimate((data['t'] - now) / unit, low, high, x0, x1, ax.bbox.width)
+                line.set_data(x, y)
+                limits = hysteresis_limits(ax.get_ylim(), float(y.min()), float(y.max()))
+                if limits is not None:
+                    ax.set_ylim(limits)
                     redraw_full = True
-                else:
-                    redraw_full = False
-
-            if self.receive_new_position_data and len(self.position_data['value']) > 0:
-                self.position_line.set_data(range(len(self.position_data['value'])), self.position_data['value'])
-                old_ylim = self.ax3.get_ylim()
-                self.ax3.relim()
-                self.ax3.autoscale_view(scalex=False, scaley=True)
-                new_ylim = self.ax3.get_ylim()
-                # Проверяем: изменились ли границы Y
-                if old_ylim != new_ylim:
-                    redraw_full = True
-                else:
-                    redraw_full = False
-
-            # Первая отрисовка - сохраняем фон
-            if self.ax1_background is None or redraw_full:
-                self.temp_line.set_animated(True)
-                self.pressure_line.set_animated(True)
-                self.position_line.set_animated(True)
-                self.fig.canvas.draw()
-                self.ax1_background = self.canvas.copy_from_bbox(self.ax1.bbox)
-                self.ax2_background = self.canvas.copy_from_bbox(self.ax2.bbox)
-                self.ax3_background = self.canvas.copy_from_bbox(self.ax3.bbox)
-
-
-            # Последующие обновления с blitting
-            self.canvas.restore_region(self.ax1_background)
-            self.ax1.draw_artist(self.temp_line)
-            self.canvas.restore_region(self.ax2_background)
-            self.ax2.draw_artist(self.pressure_line)
-            self.canvas.restore_region(self.ax3_background)
-            self.ax3.draw_artist(self.position_line)
-
-            # Обновляем только измененные области
-            self.canvas.blit(self.ax1.bbox)
-            self.canvas.blit(self.ax2.bbox)
-            self.canvas.blit(self.ax3.bbox)
+
+            if redraw_full:
+                # Фон сохраняется и линии рисуются в _on_draw
+                self.canvas.draw()
+                return
+
+            backgrounds = (self.ax1_background, self.ax2_background, self.ax3_background)
+            for background, (line, ax, _) in zip(backgrounds, self.graph_lines):
+                self.canvas.restore_region(background)
+                ax.draw_artist(line)
+            # Обновляем только области осей
+            for _, ax, _ in self.graph_lines:
+                self.canvas.blit(ax.bbox)
 
         except Exception as e:
             self.append_command_log(f"Ошибка обновления графиков: {e}")
@@ -333,7 +414,37 @@ class DeviceGUI:
             self.receive_new_position_data = False
 
     def _update_interval_upd_data(self, interval):
-        self.interval_upd_data.set(f"Обновление данных: {interval}мс")
+        """Период обновления данных (из потока опроса, показывается при обновлении окна)"""
+        self._data_interval = interval
+
+    def _set_poll_report(self, report):
+        """Статистика опроса (из потока опроса, показывается при обновлении окна)"""
+        self._poll_report = report
+
+    def _update_poll_stats(self, report):
+        """Показывает фактическую частоту и джиттер опроса по регистрам"""
+        names = {
+            REG_STATUS: "Статус",
+            REG_MEASURED_PRESSURE: "Давление",
+            REG_TEMPERATURE: "Темп.",
+            REG_POSITION_LO: "Поз.LO",
+            REG_POSITION_HI: "Поз.HI",
+        }
+        parts = []
+        for addr, stats in report.items():
+            if not stats['count']:
+                continue
+            target = f"/{stats['target_hz']:.0f}" if stats['target_hz'] else ""
+            parts.append(f"{names.get(addr, hex(addr))}: {stats['rate_hz']:.1f}{target} Гц "
+                         f"±{stats['jitter_ms']:.1f}мс")
+        pacing = self.controller.pacer.stats()
+        if pacing['rtt_p50_ms'] is not None:
+            parts.append(f"RTT p50/p99: {pacing['rtt_p50_ms']:.1f}/{pacing['rtt_p99_ms']:.1f}мс, "
+                         f"пауза {pacing['gap_ms']:.1f}мс, ошибки {pacing['error_rate'] * 100:.1f}%")
+        cycle = self.metrics.histogram('poll_cycle')
+        if cycle.count:
+            parts.append(f"цикл p50/p99: {cycle.percentile(50):.1f}/{cycle.percentile(99):.1f}мс")
+        self.poll_stats_var.set("   ".join(parts))
 
     def _create_ping_frame(self, parent):
         frame = ttk.LabelFrame(parent, text="Связь", padding="5")
@@ -341,6 +452,26 @@ class DeviceGUI:
 
         ttk.Label(frame, textvariable=self.interval_polling).grid(row=0, column=0, padx=5, sticky='w')
         ttk.Label(frame, textvariable=self.interval_upd_data).grid(row=0, column=1, padx=5, sticky='w')
+        ttk.Label(frame, textvariable=self.connection_state_var).grid(row=0, column=2, padx=5, sticky='w')
+        ttk.Button(frame, text="Метрики", command=self._dump_metrics).grid(row=0, column=3, padx=5, sticky='e')
+        ttk.Label(frame, textvariable=self.poll_stats_var).grid(row=1, column=0, columnspan=4, padx=5, sticky='w')
+        frame.grid_columnconfigure(2, weight=1)
+
+    def _dump_metrics(self):
+        """Сохраняет снимок метрик в logs/metrics_*.json (в фоновом потоке)"""
+        def _dump():
+            try:
+                path = dump_metrics({'metrics': self.metrics,
+                                     'connection': self.controller.connection.stats(),
+                                     'pacing': self.controller.pacer.stats(),
+                                     'log': self.logger.stats(),
+                                     'view': self.view.stats(),
+                                     'console': self.console.stats()})
+                self.append_command_log(f"Метрики сохранены в {path}")
+            except Exception as e:
+                self.append_command_log(f"Ошибка сохранения метрик: {e}")
+
+        threading.Thread(target=_dump, name="metrics-dump", daemon=True).start()
 
     def _create_status_frame(self, parent):
         """Создает фрейм статуса"""
@@ -442,87 +573,179 @@ class DeviceGUI:
             row=0, column=1, padx=5, pady=2)
         ttk.Button(frame, text="20 изм", command=lambda: self._rec_to_log(20)).grid(
             row=0, column=2, padx=5, pady=2)
+        ttk.Button(frame, text="Экспорт xlsx", command=self._export_log).grid(
+            row=1, column=1, columnspan=2, padx=5, pady=2)
 
         cb = ttk.Checkbutton(frame, text="Запущен", variable=self.log_enable, state='disabled')
         cb.grid(row=1, column=0, padx=5, sticky='w')
+        ttk.Label(frame, textvariable=self.burst_var).grid(row=2, column=0, columnspan=3, padx=5, sticky='w')
 
         for i in range(3):
             frame.grid_columnconfigure(i, weight=1)
 
     def _start_background_tasks(self):
-        """Оптимизированный планировщик задач"""
-        start_time = time.time()
+        """Подписывает окно на новые отсчеты и запускает цикл обновления.
+
+        Поток опроса при новом отсчете только устанавливает флаг _wake
+        (вызов Tk из другого потока ждал бы, пока занят поток Tk, и
+        останавливал бы опрос), журнал сообщений - флаг console.pending.
+        Флаги проверяет цикл _tick_loop в потоке Tk.
+        """
+        self.controller.init_new_sample(self._wake.set)
+        self._schedule_tick(0)
+
+    def _schedule_tick(self, delay_ms):
+        """Переносит следующую проверку _tick_loop (в потоке Tk)"""
+        if self._tick_after is not None:
+            self.window.after_cancel(self._tick_after)
+        self._tick_after = self.window.after(delay_ms, self._tick_loop)
+
+    def _call_soon(self, func, *args):
+        """Выполняет func(*args) в потоке Tk (можно вызывать из любого потока).
+
+        Фоновый поток только добавляет вызов в очередь и не обращается
+        к Tk, поэтому не ждет занятый поток Tk и не блокирует его join().
+        """
+        self._calls.append((func, args))
+        self._wake.set()
+
+    def _request_tick(self):
+        """Запрашивает обновление окна без ожидания (только в потоке Tk)"""
+        self._wake.set()
+        if self._tick_delay > 1000 // GUI_REFRESH_HZ:
+            self._tick_delay = 1000 // GUI_REFRESH_HZ
+            self._schedule_tick(0)
+
+    def _tick_loop(self):
+        """Цикл обновления окна (в потоке Tk).
+
+        Пока идут данные, флаг проверяется GUI_REFRESH_HZ раз в секунду
+        и все накопившиеся отсчеты показываются одним обновлением; без
+        данных период проверки удваивается до GUI_IDLE_TICK_MS.
+        """
+        self._tick_after = None
+        while self._calls:
+            func, args = self._calls.popleft()
+            try:
+                func(*args)
+            except Exception as e:
+                self.append_command_log(f"Ошибка обработчика: {e}")
+        if self._wake.is_set():
+            self._wake.clear()  # До чтения буфера: отсчет, пришедший во время _tick, не теряется
+            self._tick()
+            self._tick_delay = 1000 // GUI_REFRESH_HZ
+        elif self.console.pending:
+            self.console.flush()
+            self._tick_delay = 1000 // GUI_REFRESH_HZ
+        else:
+            self._tick_delay = min(self._tick_delay * 2, GUI_IDLE_TICK_MS)
+            self.console.flush()  # Итоги подавленных повторов без новых сообщений
+        report, self._poll_report = self._poll_report, None
+        if report is not None:
+            self._update_poll_stats(report)
+        self._schedule_tick(self._tick_delay)
 
-        #self.controller.start_polling(one_poll=True)
+    def _tick(self):
+        """Обновление окна по новым данным (в потоке Tk)"""
+        started = time.perf_counter()
 
-        # Обновляем данные
         self._update_data()
-
-        # Обновляем графики только если есть новые данные
-        if self.receive_new_temperature_data or self.receive_new_pressure_data:
-            self._update_graphs()
-
-        # Логируем данные (реже)
-        if time.time() - self.last_log_time >= 0.5 and self.log_enable.get():  # Раз в секунду
-            self._log_data()
-            self.last_log_time = time.time()
-
-        # Динамически регулируем интервал
-        processing_time = time.time() - start_time
-        next_interval = max(2, int(processing_time * 1000 * 1.1))  # +10% к времени обработки
-        self.interval_polling.set(f"Обновление окна: {int(next_interval)}мс")
-
-        if self.window.winfo_exists():
-            self.window.after(next_interval, self._start_background_tasks)
+        self._update_graphs()
+        if self._data_interval is not None:
+            self.view.set('data_interval', self._data_interval)
+            self._data_interval = None
+        self.view.commit()
+        self.console.flush()
+
+        processing_time = time.perf_counter() - started
+        self._tick_histogram.record(processing_time)
+        # Показывается на следующем обновлении (вместе с его изменениями)
+        self.view.set('tick_ms', round(processing_time * 1000, 1))
+
+        # Графики ограничены GRAPHS_FPS: если кадр пропущен, данные
+        # показываются на следующем обновлении
+        if (self.receive_new_temperature_data or self.receive_new_pressure_data
+                or self.receive_new_position_data) and self.canvas is not None:
+            self._wake.set()
 
     def _check_connection(self):
-        """Проверяет соединение с устройством"""
-        if not self.controller._ensure_connection():
+        """Проверяет соединение с устройством (без ожидания переподключения)"""
+        if not self.controller.connection.connected:
             self.append_command_log("Предупреждение: проблемы с соединением")
 
+    def _show_connection_state(self, state):
+        """Отображает состояние соединения и статистику переподключений"""
+        names = {
+            STATE_CONNECTED: "подключено",
+            STATE_CONNECTING: "подключение...",
+            STATE_DISCONNECTED: "нет связи",
+        }
+        text = f"Связь: {names.get(state, state)}"
+        if state == STATE_CONNECTED:
+            self._mark_startup("подключение")
+        stats = self.controller.connection.stats()
+        if stats['reconnects'] > 1 and stats['last_outage_s'] is not None:
+            text += f" (переподкл.: {stats['reconnects'] - 1}, простой {stats['last_outage_s']:.1f} с)"
+        self.connection_state_var.set(text)
+
+    def _on_result(self, future, callback):
+        """Вызывает callback(результат) в потоке Tk по завершении транзакции"""
+        def _done(f):
+            try:
+                result = f.result()
+            except Exception as e:
+                self.append_command_log(f"Ошибка транзакции: {e}")
+                return
+            self._call_soon(callback, result)
+
+        future.add_done_callback(_done)
+
     def _send_command(self, register, value):
         """Отправляет команду устройству"""
-        if self.controller.write_register(register, value):
-            self.append_command_log(f"Команда отправлена: регистр 0x{register:02X}, значение 0x{value:04X}")
+        def _done(ok):
+            if ok:
+                self.append_command_log(f"Команда отправлена: регистр 0x{register:02X}, значение 0x{value:04X}")
+
+        self._on_result(self.controller.write_register_async(register, value), _done)
 
     def _set_pressure(self):
         """Устанавливает давление"""
         try:
             value = int(float(self.set_pressure_var.get()) * 10)
-            # status = self.controller.read_register(REG_STATUS)
-            # if status is None:
-            #     return
-
-            # was_stab = False #status & 0x01
-            # if was_stab:
-            #     self.controller.write_register(REG_COMMAND, CMD_STOP)
+        except ValueError:
+            self.append_command_log("Ошибка: введите число")
+            return
 
-            if self.controller.write_register(REG_SET_PRESSURE, value):
+        def _done(ok):
+            if ok:
                 self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_PRESSURE:02X}, значение 0x{value:04X}")
                 self.append_command_log(f"Давление установлено: {value / 10} Pa")
 
-            # if was_stab:
-            #     self.controller.write_register(REG_COMMAND, CMD_START)
-        except ValueError:
-            self.append_command_log("Ошибка: введите число")
+        self._on_result(self.controller.write_register_async(REG_SET_PRESSURE, value), _done)
 
     def _read_pressure(self):
         """Читает текущее значение уставки давления"""
-        value = self.controller.read_register(REG_SET_PRESSURE)
-        if value is not None:
-            self.set_pressure_var.set(str(value / 10))
-            self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_PRESSURE:02X}, ответ 0x{value:04X}")
-        else:
-            self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_PRESSURE:02X}, ответа НЕТ")
+        def _done(value):
+            if value is not None:
+                self.set_pressure_var.set(str(value / 10))
+                self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_PRESSURE:02X}, ответ 0x{value:04X}")
+            else:
+                self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_PRESSURE:02X}, ответа НЕТ")
+
+        self._on_result(self.controller.read_register_async(REG_SET_PRESSURE), _done)
 
     def _set_position(self):
         """Устанавливает позицию заслонки"""
         value = self.position_var_set.get()
-        if self.controller.write_register(REG_SET_POSITION, value):
-            self.append_command_log(f"Позиция установлена: {value}")
-            self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_POSITION:02X}, ответ 0x{value:04X}")
-        else:
-            self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_POSITION:02X}, ответа НЕТ")
+
+        def _done(ok):
+            if ok:
+                self.append_command_log(f"Позиция установлена: {value}")
+                self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_POSITION:02X}, ответ 0x{value:04X}")
+            else:
+                self.append_command_log(f"Команда отправлена: регистр 0x{REG_SET_POSITION:02X}, ответа НЕТ")
+
+        self._on_result(self.controller.write_register_async(REG_SET_POSITION, value), _done)
 
     def _set_position_var(self, value):
         """Меняет значение переменной с текстом установленного положения заслонки"""
@@ -531,116 +754,94 @@ class DeviceGUI:
 
     def _set_middle_position(self):
         """Устанавливает среднее положение заслонки без блокировки главного цикла"""
-        value = self.controller.read_register(REG_STATUS)
-        if value is None:
-            self.append_command_log(f"Команда отправлена: регистр 0x{REG_STATUS:02X}, ответа НЕТ")
-            return
-        else:
+        def _done(value):
+            if value is None:
+                self.append_command_log(f"Команда отправлена: регистр 0x{REG_STATUS:02X}, ответа НЕТ")
+                return
             self.append_command_log(f"Команда отправлена: регистр 0x{REG_STATUS:02X}, ответ 0x{value:04X}")
 
-        self.controller.write_register(REG_COMMAND, CMD_OPEN)
-        self.append_command_log(f"Команда отправлена: регистр 0x{REG_COMMAND:02X}, значение  0x{CMD_OPEN:04X}")
-        # Запускаем проверку каждые 1000 мс до наступления нужного статуса
-        self.window.after(1000, self._check_and_set_middle)
-
-    def _check_and_set_middle(self):
-        """Проверяет, установлен ли нужный статус, и отправляет команду установки среднего положения"""
-        status = self.controller.read_register(REG_STATUS)
-        self.append_command_log(
-            f"Команда отправлена: регистр 0x{REG_STATUS:02X}, "
-            f"ответ 0x{status:04X}" if status is not None else
-            f"Команда отправлена: регистр 0x{REG_STATUS:02X}, ответ None"
-        )
-        if status is not None and (status & 0x02):
-            self.controller.write_register(REG_COMMAND, CMD_MIDDLE_POSITION)
-            self.append_command_log(f"Команда отправлена: регистр 0x{REG_COMMAND:02X}, значение  0x{CMD_MIDDLE_POSITION:04X}")
-        else:
-            # Если условие не выполнено, проверяем снова через 1000 мс
+            self.controller.write_register_async(REG_COMMAND, CMD_OPEN)
+            self.append_command_log(f"Команда отправлена: регистр 0x{REG_COMMAND:02X}, значение  0x{CMD_OPEN:04X}")
+            # Запускаем проверку каждые 1000 мс до наступления нужного статуса
             self.window.after(1000, self._check_and_set_middle)
 
-    def _log_data(self):
-        """Логирование данных через модуль DataLogger"""
-        try:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # Получаем текущие значения
-            temp = self.temperature_var.get().replace(" °C", "") if self.temperature_var.get() != "---" else None
-            pressure = self.measured_pressure_var.get().replace(" Pa", "") if self.measured_pressure_var.get() != "---" else None
-            position = self.position_var.get()
-
-            # Получаем статус в виде битовой маски
-            status = 0
-            for i, (name, var) in enumerate(self.status_vars.items()):
-                status |= int(var.get()) << i
+        self._on_result(self.controller.read_register_async(REG_STATUS), _done)
 
-            # Передаем данные логгеру
-            self.logger.add_data(current_time, temp, pressure, position, status)
+    def _check_and_set_middle(self):
+        """Проверяет, установлен ли нужный статус, и отправляет команду установки среднего положения"""
+        def _done(status):
+            self.append_command_log(
+                f"Команда отправлена: регистр 0x{REG_STATUS:02X}, "
+                f"ответ 0x{status:04X}" if status is not None else
+                f"Команда отправлена: регистр 0x{REG_STATUS:02X}, ответ None"
+            )
+            if status is not None and (status & 0x02):
+                self.controller.write_register_async(REG_COMMAND, CMD_MIDDLE_POSITION)
+                self.append_command_log(f"Команда отправлена: регистр 0x{REG_COMMAND:02X}, значение  0x{CMD_MIDDLE_POSITION:04X}")
+            else:
+                # Если условие не выполнено, проверяем снова через 1000 мс
+                self.window.after(1000, self._check_and_set_middle)
 
-        except Exception as e:
-            self.append_command_log(f"Ошибка при логировании данных: {e}")
+        self._on_result(self.controller.read_register_async(REG_STATUS), _done)
 
     def _start_log(self, is_on):
+        """Подписывает логгер на отсчеты опроса: пишется каждый цикл опроса"""
+        if is_on == self.log_enable.get():
+            return
         self.log_enable.set(is_on)
         if is_on:
+            self.logger.subscribe(self.controller.samples)
             print(f"Логирование запущено")
         else:
+            self.logger.unsubscribe()
             print(f"Логирование остановлено")
 
+    def _export_log(self):
+        """Экспортирует журнал в Excel в фоновом потоке записи"""
+        def _done(f):
+            try:
+                self.append_command_log(f"Журнал экспортирован в {f.result()}")
+            except Exception as e:
+                self.append_command_log(f"Ошибка экспорта журнала: {e}")
+
+        self.append_command_log("Экспорт журнала...")
+        self.logger.export_xlsx().add_done_callback(_done)
+
     def _rec_to_log(self, n):
-        """Выполняет n измерений и сохраняет их в лог"""
-        start_measurement_time = time.time()
-        measurements = []
+        """Запускает в фоне серию из n измерений и сохраняет ее в лог одной пачкой"""
+        if self.burst is not None and not self.burst.future.done():
+            self.append_command_log("Серия измерений уже выполняется")
+            return
+
+        def _progress(done, total):
+            self._call_soon(self.burst_var.set, f"Серия: {done}/{total}")
+
+        def _done(burst):
+            self._call_soon(self._burst_done, burst)
 
         print(f"Старт {n} измерений")
-        while len(measurements) < n and time.time() - start_measurement_time < 60:
-            print(f"{len(measurements)} измерение")
-            # Получаем текущие значения
-            temp = self.controller.read_register(REG_TEMPERATURE)
-            pressure = self.controller.read_register(REG_MEASURED_PRESSURE)
-            address, value = self.controller.position_queue_LO.get()
-            if address == REG_POSITION_LO:
-                position_lo = value
-                self.append_command_log(f'pos_lo: {position_lo}')
-            address, value = self.controller.position_queue_HI.get()
-            if address == REG_POSITION_HI:
-                position_hi = value
-                self.append_command_log(f'pos_hi: {position_hi}')
-            position = (position_hi << 16) | position_lo
-            status = self.controller.read_register(REG_STATUS)
-
-            if None in (temp, pressure, position, status):
-                continue  # Пропускаем если нет данных
-
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            measurements.append([
-                current_time,
-                temp / 10.0,  # Температура
-                pressure / 10.0,  # Давление
-                position,  # Позиция
-                status  # Статус
-            ])
-
-            time.sleep(0.2)  # Интервал между измерениями
-
-        # Сохраняем все измерения одним пакетом
-        if measurements:
+        self.burst = self.controller.start_burst(count=n, on_progress=_progress, on_done=_done)
+
+    def _burst_done(self, burst):
+        """Сохраняет завершенную серию измерений (в потоке Tk)"""
+        if burst.error is not None:
+            self.append_command_log(f"Серия {burst.burst_id} прервана: {burst.error}")
+        if not burst.captured:
+            self.burst_var.set("Серия: нет данных")
+            return
+        self.burst_var.set(f"Серия: {burst.captured} изм, {burst.rate_hz:.0f} Гц")
+
+        def _saved(f):
             try:
-                for measurement in measurements:
-                    self.logger.add_data(*measurement)
-                self.logger.flush()  # Принудительно сохраняем
-                self.append_command_log(f"Успешно сохранено {len(measurements)} измерений")
+                self.append_command_log(f"Серия {burst.burst_id}: сохранено {f.result()} измерений")
             except Exception as e:
                 self.append_command_log(f"Ошибка при сохранении измерений: {e}")
 
-    def append_command_log(self, message: str):
-        """Добавляет строку в окно вывода команд"""
-
-        def _append():
-            self.command_output.insert('end', message + '\n')
-            self.command_output.see('end')
+        self.logger.add_burst(burst.burst_id, burst.samples).add_done_callback(_saved)
 
-        self.command_output.after(0, _append)
+    def append_command_log(self, message: str):
+        """Добавляет строку в окно вывода команд (из любого потока, показывается при обновлении окна)"""
+        self.console.write(message)
 
     def _add_context_menu(self, widget):
         """Добавляет контекстное меню с возможностью копирования"""
@@ -656,9 +857,45 @@ class DeviceGUI:
         widget.bind("<Button-3>", show_menu)  # ПКМ для Windows и Linux
 
     def on_close(self):
-        """Обработчик закрытия окна"""
-        self.logger.flush()  # Сохраняем данные перед выходом
-        self.controller.disconnect()
+        """Обработчик закрытия окна.
+
+        Фоновые потоки отписываются от окна, а дозапись лога и остановка
+        контроллера (join() его потоков) выполняются в отдельном потоке:
+        поток Tk не ждет их и продолжает обрабатывать события. Окно
+        уничтожается по завершении остановки, но не позже GUI_SHUTDOWN_TIMEOUT.
+        """
+        if self._closing:
+            return
+        self._closing = True
+        self.window.withdraw()
+        if self.burst is not None:
+            self.burst.cancel()
+        if self.startup_timer is not None:
+            self.startup_timer.finish()  # Если какой-то этап так и не был пройден
+        self.controller.init_new_sample(None)
+        self.controller.init_poll_stats(None)
+        self.controller.init_func_time_culc(None)
+        self.controller.connection.remove_listener(self._connection_listener)
+
+        closer = threading.Thread(target=self._shutdown, name="shutdown", daemon=True)
+        closer.start()
+        self._wait_shutdown(closer, time.monotonic() + GUI_SHUTDOWN_TIMEOUT)
+
+    def _shutdown(self):
+        """Дописывает очередь лога и отключается от устройства (в отдельном потоке)"""
+        try:
+            self.logger.close(GUI_SHUTDOWN_TIMEOUT)
+        finally:
+            self.controller.disconnect(GUI_SHUTDOWN_TIMEOUT)
+            if self.startup_timer is not None:
+                self.startup_timer.wait(GUI_SHUTDOWN_TIMEOUT)
+
+    def _wait_shutdown(self, closer, deadline):
+        """Уничтожает окно после остановки фоновых потоков (в потоке Tk)"""
+        if closer.is_alive() and time.monotonic() < deadline:
+            self.window.after(50, self._wait_shutdown, closer, deadline)
+            return
+        self.console.close(GUI_SHUTDOWN_TIMEOUT)
         self.window.destroy()
 
     def run(self):
@@ -0,0 +1,210 @@
+"""Модуль истории измерений с несколькими уровнями разрешения"""
+
+import math
+import time
+
+import numpy as np
+
+from constants import HISTORY_RAW_CAPACITY, HISTORY_TIERS, HISTORY_MAX_POINTS
+from sample_buffer import FIELD_TEMPERATURE, FIELD_PRESSURE, FIELD_POSITION
+
+# Каналы истории: (имя, флаг поля отсчета, масштаб сырого значения)
+CHANNELS = (
+    ('temperature', FIELD_TEMPERATURE, 0.1),
+    ('pressure', FIELD_PRESSURE, 0.1),
+    ('position', FIELD_POSITION, 1.0),
+)
+_NAMES = tuple(name for name, _, _ in CHANNELS)
+
+# Сырые отсчеты: NaN в канале, если поле не прочитано в этом цикле
+RAW_DTYPE = np.dtype([('t', 'f8')] + [(name, 'f8') for name in _NAMES])
+# Интервал уровня: начало интервала и min/max/mean каждого канала
+TIER_DTYPE = np.dtype([('t', 'f8')] + [(f"{name}_{stat}", 'f8')
+                                        for name in _NAMES for stat in ('min', 'max', 'mean')])
+
+
+class _Ring:
+    """Кольцевой массив записей, упорядоченных по времени t"""
+
+    def __init__(self, capacity, dtype):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=dtype)
+        self.count = 0  # Всего добавлено записей
+
+    def extend(self, rows):
+        n = len(rows)
+        if not n:
+            return
+        if n > self.capacity:
+            self.count += n - self.capacity
+            rows = rows[-self.capacity:]
+            n = self.capacity
+        start = self.count % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = rows[:first]
+        self._data[:n - first] = rows[first:]
+        self.count += n
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def oldest(self):
+        """Время самой старой хранимой записи или None"""
+        if not self.count:
+            return None
+        return float(self._data['t'][self.count % self.capacity if self.full else 0])
+
+    def since(self, t0):
+        """Записи с t >= t0 в порядке времени"""
+        if not self.full:
+            data = self._data[:self.count]
+            return data[np.searchsorted(data['t'], t0):]
+        split = self.count % self.capacity
+        older, newer = self._data[split:], self._data[:split]
+        if not len(older) or older['t'][-1] < t0:
+            return newer[np.searchsorted(newer['t'], t0):]
+        return np.concatenate((older[np.searchsorted(older['t'], t0):], newer))
+
+
+class _Tier:
+    """Уровень истории: агрегаты min/max/mean за интервалы width секунд"""
+
+    def __init__(self, width, capacity):
+        self.width = width
+        self.ring = _Ring(capacity, TIER_DTYPE)
+        self._bucket = None  # Номер текущего (незакрытого) интервала
+        self._count = np.zeros(len(CHANNELS))
+        self._sum = np.zeros(len(CHANNELS))
+        self._min = np.full(len(CHANNELS), np.inf)
+        self._max = np.full(len(CHANNELS), -np.inf)
+
+    def add(self, t, values, fresh):
+        """Добавляет отсчеты: t (n,), values и fresh - (n, число каналов)"""
+        ids = np.floor(t / self.width)
+        if self._bucket is not None:
+            ids[0] = max(ids[0], self._bucket)
+        ids = np.maximum.accumulate(ids)  # Шаг часов назад не открывает прошлые интервалы
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+
+        counts = np.add.reduceat(fresh, starts, axis=0)
+        sums = np.add.reduceat(np.where(fresh, values, 0.0), starts, axis=0)
+        mins = np.minimum.reduceat(np.where(fresh, values, np.inf), starts, axis=0)
+        maxs = np.maximum.reduceat(np.where(fresh, values, -np.inf), starts, axis=0)
+
+        closed = []
+        for i, bucket in enumerate(ids[starts].tolist()):
+            if bucket != self._bucket:
+                if self._bucket is not None:
+                    closed.append(self._row())
+                self._bucket = bucket
+                self._count[:] = 0
+                self._sum[:] = 0
+                self._min[:] = np.inf
+                self._max[:] = -np.inf
+            self._count += counts[i]
+            self._sum += sums[i]
+            np.minimum(self._min, mins[i], out=self._min)
+            np.maximum(self._max, maxs[i], out=self._max)
+        if closed:
+            self.ring.extend(np.array(closed, dtype=TIER_DTYPE))
+
+    def _row(self):
+        """Агрегаты текущего интервала (NaN для каналов без значений)"""
+        empty = self._count == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(empty, np.nan, self._sum / self._count)
+        low = np.where(empty, np.nan, self._min)
+        high = np.where(empty, np.nan, self._max)
+        row = [self._bucket * self.width]
+        for i in range(len(CHANNELS)):
+            row += [low[i], high[i], mean[i]]
+        return tuple(row)
+
+    def since(self, t0):
+        """Закрытые интервалы с начала t0 и текущий незакрытый"""
+        rows = self.ring.since(t0 - self.width)
+        if self._bucket is None:
+            return rows
+        return np.concatenate((rows, np.array([self._row()], dtype=TIER_DTYPE)))
+
+
+class HistoryStore:
+    """История измерений в памяти для графиков с длинным горизонтом.
+
+    Сырые отсчеты хранятся в кольцевом массиве ограниченной емкости,
+    а параллельно по мере поступления сворачиваются в уровни с интервалами
+    HISTORY_TIERS (1 с, 10 с, 1 мин) со значениями min/max/mean. Память
+    ограничена емкостями уровней. window() выбирает самый подробный
+    уровень, который покрывает запрошенный интервал не более чем
+    max_points точками, поэтому стоимость отрисовки не зависит от горизонта.
+
+    Время - секунды Unix (из t_ns отсчета). Класс не потокобезопасен:
+    add() и window() вызываются из одного потока (потока Tk).
+    """
+
+    def __init__(self, raw_capacity=HISTORY_RAW_CAPACITY, tiers=HISTORY_TIERS):
+        """
+        :param raw_capacity: емкость кольца сырых отсчетов
+        :param tiers: уровни агрегации ((интервал, с; емкость), ...) от мелкого к крупному
+        """
+        self.raw = _Ring(raw_capacity, RAW_DTYPE)
+        self.tiers = [_Tier(width, capacity) for width, capacity in tiers]
+        self.last_t = None
+
+    def add(self, batch):
+        """Добавляет пачку отсчетов SAMPLE_DTYPE (в порядке времени)"""
+        n = len(batch)
+        if not n:
+            return
+        t = batch['t_ns'] / 1e9
+        fresh = np.empty((n, len(CHANNELS)), dtype=bool)
+        values = np.empty((n, len(CHANNELS)))
+        for i, (name, field, scale) in enumerate(CHANNELS):
+            fresh[:, i] = (batch['fresh'] & field) != 0
+            values[:, i] = batch[name] * scale
+
+        rows = np.empty(n, dtype=RAW_DTYPE)
+        rows['t'] = t
+        for i, name in enumerate(_NAMES):
+            rows[name] = np.where(fresh[:, i], values[:, i], np.nan)
+        self.raw.extend(rows)
+        for tier in self.tiers:
+            tier.add(t, values, fresh)
+        self.last_t = float(t[-1])
+
+    def window(self, span, now=None, max_points=HISTORY_MAX_POINTS):
+        """
+        Данные за последние span секунд для отрисовки
+
+        :param span: длительность интервала, с
+        :param now: конец интервала (по умолчанию - текущее время)
+        :param max_points: максимум точек на канал
+        :return: {'resolution': интервал уровня, с (0 - сырые отсчеты),
+                  канал: {'t', 'mean', 'min', 'max'}} - массивы без пропусков
+        """
+        now = time.time() if now is None else now
+        t0 = now - span
+        rows, resolution = None, 0.0
+        sources = [(0.0, self.raw)] + [(tier.width, tier) for tier in self.tiers]
+        for i, (width, source) in enumerate(sources):
+            ring = source if width == 0.0 else source.ring
+            last = i == len(sources) - 1
+            oldest = ring.oldest()
+            if not last and ring.full and oldest is not None and oldest > t0:
+                continue  # Уровень уже не хранит начало интервала
+            rows, resolution = source.since(t0), width
+            if len(rows) <= max_points or last:
+                break
+
+        if len(rows) > max_points:
+            rows = rows[::math.ceil(len(rows) / max_points)]
+        result = {'resolution': resolution}
+        for name in _NAMES:
+            if resolution == 0.0:
+                mean = low = high = rows[name]
+            else:
+                mean, low, high = rows[f"{name}_mean"], rows[f"{name}_min"], rows[f"{name}_max"]
+            mask = ~np.isnan(mean)
+            result[name] = {'t': rows['t'][mask], 'mean': mean[mask], 'min': low[mask], 'max': high[mask]}
+        return result
@@ -0,0 +1,111 @@
+"""Модуль контроля живости соединения с устройством"""
+
+import socket
+import threading
+import time
+
+from constants import KEEPALIVE_IDLE, KEEPALIVE_INTERVAL, KEEPALIVE_COUNT, HEARTBEAT_IDLE
+
+
+def configure_keepalive(sock, idle=KEEPALIVE_IDLE, interval=KEEPALIVE_INTERVAL, count=KEEPALIVE_COUNT):
+    """Включает TCP keepalive с заданными интервалами (в секундах).
+
+    Ядро само обнаружит пропавшего собеседника примерно за
+    idle + interval * count секунд без какого-либо трафика с нашей стороны.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, 'SIO_KEEPALIVE_VALS'):
+        # Windows: число проб задается системой
+        sock.ioctl(socket.SIO_KEEPALIVE_VALS, (1, int(idle * 1000), int(interval * 1000)))
+        return
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, max(1, int(idle)))
+    elif hasattr(socket, 'TCP_KEEPALIVE'):
+        # macOS
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, max(1, int(idle)))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, int(interval)))
+    if hasattr(socket, 'TCP_KEEPCNT'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count)
+
+
+class LivenessMonitor:
+    """Следит за временем последнего успешного ответа устройства.
+
+    Пока идет опрос, каждый ответ подтверждает живость соединения и
+    дополнительных запросов не требуется. Если канал простаивает дольше
+    idle секунд, выполняется легкий контрольный запрос heartbeat().
+    Обнаружение мертвого собеседника регистрируется через report_dead().
+    """
+
+    def __init__(self, heartbeat, idle=HEARTBEAT_IDLE, is_connected=None, name="liveness"):
+        """
+        :param heartbeat: функция контрольного запроса, вызывается при простое
+        :param idle: время простоя канала до контрольного запроса, с
+        :param is_connected: функция проверки наличия соединения
+        """
+        self.heartbeat = heartbeat
+        self.idle = idle
+        self.is_connected = is_connected or (lambda: True)
+        self.name = name
+        self.last_response = time.monotonic()
+        self.heartbeats = 0
+        self.dead_peers = 0
+        self.last_dead_reason = None
+        self.last_dead_time = None
+        self._stop = threading.Event()
+        self.t = None
+
+    def touch(self):
+        """Отмечает успешный ответ устройства"""
+        self.last_response = time.monotonic()
+
+    def idle_time(self):
+        """Время с последнего успешного ответа, с"""
+        return time.monotonic() - self.last_response
+
+    def report_dead(self, reason):
+        """Регистрирует обнаружение разорванного соединения"""
+        self.dead_peers += 1
+        self.last_dead_reason = str(reason)
+        self.last_dead_time = time.time()
+        print(f"[{self.name}] Устройство не отвечает, соединение признано разорванным: {reason}")
+
+    def start(self):
+        """Запускает фоновую проверку простоя"""
+        if self.t is not None and self.t.is_alive():
+            return
+        self._stop.clear()
+        self.t = threading.Thread(target=self._run, name=f"{self.name}-heartbeat", daemon=True)
+        self.t.start()
+
+    def stop(self, timeout=None):
+        """Останавливает фоновую проверку (ждет поток не дольше timeout секунд)"""
+        self._stop.set()
+        if self.t is not None and self.t is not threading.current_thread():
+            self.t.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            remaining = self.idle - self.idle_time()
+            if remaining > 0:
+                self._stop.wait(remaining)
+                continue
+            if self.is_connected():
+                self.heartbeats += 1
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    print(f"[{self.name}] Ошибка контрольного запроса: {e}")
+            # Не чаще одного контрольного запроса за idle секунд
+            self._stop.wait(self.idle)
+
+    def stats(self):
+        """Статистика контроля живости"""
+        return {
+            'idle_s': self.idle_time(),
+            'heartbeats': self.heartbeats,
+            'dead_peers': self.dead_peers,
+            'last_dead_reason': self.last_dead_reason,
+            'last_dead_time': self.last_dead_time,
+        }
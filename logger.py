@@ -1,41 +1,127 @@
 # logger.py
-"""Модуль для логирования данных в Excel"""
+"""Модуль для логирования данных (CSV-сегменты по дням и устройствам, экспорт в Excel)"""
 
-import pandas as pd
+import csv
+import io
 from pathlib import Path
+from concurrent.futures import Future
+from queue import Queue, Full, Empty
 import logging
+import threading
 import time
 import os
 
+from metrics import MetricsRegistry
+from sample_buffer import FIELD_STATUS, FIELD_PRESSURE, FIELD_TEMPERATURE, FIELD_POSITION
+from storage import PartitionedStore, SEGMENT_MAX_BYTES
+
+LOG_COLUMNS = [
+    "Timestamp",
+    "Temperature (°C)",
+    "Pressure (Pa)",
+    "Position",
+    "Status",
+    "t_ns",  # Время отсчета, нс от эпохи Unix
+    "Fresh",  # Маска полей, прочитанных в этом цикле опроса (FIELD_*)
+    "Burst",  # Идентификатор серии измерений (пусто для непрерывного лога)
+]
+
+
+LOG_QUEUE_SIZE = 64  # Пачек в очереди записи
+LOG_MAX_PENDING_ROWS = 100000  # Строк в буфере, ожидающих места в очереди, до отбрасывания
+LOG_SAMPLE_POLL_INTERVAL = 0.2  # Период выборки отсчетов из буфера опроса, с
+
+
 class DataLogger:
-    def __init__(self, log_interval=60):
+    """Буферизует строки лога и передает их пачками потоку записи.
+
+    Вызывающий поток (в том числе поток Tk) никогда не обращается к диску:
+    сохранение, экспорт и перенос старого журнала выполняются в отдельном
+    потоке через ограниченную очередь. Если диск не успевает и очередь
+    заполнена, строки остаются в буфере и уходят следующей, более крупной
+    пачкой; при переполнении буфера самые старые строки отбрасываются
+    и учитываются в счетчиках.
+
+    После subscribe() поток записи сам забирает отсчеты из кольцевого
+    буфера контроллера и пишет в журнал каждый цикл опроса с меткой времени
+    в наносекундах и сырыми значениями регистров, без участия Tk. Один
+    логгер может быть подписан на буферы нескольких устройств.
+    """
+
+    def __init__(self, log_interval=60, queue_size=LOG_QUEUE_SIZE, max_pending_rows=LOG_MAX_PENDING_ROWS,
+                 device="device", max_segment_bytes=SEGMENT_MAX_BYTES, log_dir="logs", metrics=None):
         """
         Инициализация логгера
 
         :param log_interval: интервал сохранения данных в секундах (по умолчанию 60)
+        :param queue_size: емкость очереди пачек на запись
+        :param max_pending_rows: емкость буфера строк при заполненной очереди
+        :param device: имя устройства (каталог его сегментов в logs/)
+        :param max_segment_bytes: размер сегмента, после которого начинается новый
+        :param log_dir: каталог журнала
+        :param metrics: реестр метрик (по умолчанию - собственный)
         """
         self.log_interval = log_interval
+        self.log_dir = Path(log_dir)
+        self.device = device
+        self.max_segment_bytes = max_segment_bytes
         self.last_log_time = time.time()
         self.log_data = []
-        self._init_logging()
         self.batch_mode = False  # Режим пакетного добавления
+        self.max_pending_rows = max_pending_rows
+        self.written_rows = 0
+        self.deferred_flushes = 0
+        self.dropped_rows = 0
+        self.queue_high_water = 0
+        self.logged_samples = 0
+        self.dropped_samples = 0  # Отсчеты, вытесненные из буфера опроса до записи
+        self._sources = {}  # Устройство -> [буфер отсчетов, номер следующего отсчета, строки]
+        self._sample_save_time = time.monotonic()
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._flush_histogram = self.metrics.histogram('log_flush')
+        self._queue = Queue(maxsize=queue_size)
+        self._closed = False
+        self._writer = threading.Thread(target=self._writer_loop, name="log-writer", daemon=True)
+        self._writer.start()
+        self._ready = self._submit(self._init_logging)
 
     def _init_logging(self):
         """Инициализация системы логирования"""
-        self.log_dir = Path("logs")
-        self.log_dir.mkdir(exist_ok=True)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
         self.log_file = self.log_dir / "device_data_log.xlsx"
+        self.store = PartitionedStore(self.log_dir, LOG_COLUMNS, max_segment_bytes=self.max_segment_bytes)
 
-        # Создаем файл с заголовками, если его нет
-        if not self.log_file.exists():
-            df = pd.DataFrame(columns=[
-                "Timestamp",
-                "Temperature (°C)",
-                "Pressure (Pa)",
-                "Position",
-                "Status"
-            ])
-            df.to_excel(self.log_file, index=False, engine='openpyxl')
+        # Переносим журналы прежних форматов (единый CSV, затем единый Excel)
+        if self.store.created:
+            legacy_csv = self.log_dir / "device_data_log.csv"
+            if legacy_csv.exists():
+                self._import_legacy_csv(legacy_csv)
+            elif self.log_file.exists():
+                self._import_legacy_xlsx()
+
+    def _import_legacy_csv(self, path):
+        """Однократный перенос строк из единого device_data_log.csv в сегменты"""
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                rows = [row for row in reader if row]
+            self.store.append(rows, device=self.device)
+            logging.info(f"Перенесено {len(rows)} строк из {path}")
+        except Exception as e:
+            logging.error(f"Ошибка переноса данных из {path}: {e}")
+
+    def _import_legacy_xlsx(self):
+        """Однократный перенос строк из device_data_log.xlsx в сегменты"""
+        try:
+            import pandas as pd
+            legacy = pd.read_excel(self.log_file, engine='openpyxl')
+            rows = legacy.reindex(columns=LOG_COLUMNS).astype(object)
+            rows = rows.where(rows.notna(), None)
+            self.store.append(rows.values.tolist(), device=self.device)
+            logging.info(f"Перенесено {len(rows)} строк из {self.log_file}")
+        except Exception as e:
+            logging.error(f"Ошибка переноса данных из {self.log_file}: {e}")
 
     def start_batch(self):
         """Начинает пакетное добавление данных"""
@@ -62,63 +148,258 @@ class DataLogger:
 
         # Проверяем, нужно ли сохранять данные
         if time.time() - self.last_log_time >= self.log_interval:
-            self._save_data()
-            self.last_log_time = time.time()
+            self.flush()
+
+    def _submit(self, func, *args):
+        """Ставит задачу в очередь потока записи, не блокируя вызывающий поток.
+
+        Возвращает Future или None, если очередь заполнена.
+        """
+        if self._closed:
+            raise RuntimeError("Логгер закрыт")
+        future = Future()
+        try:
+            self._queue.put_nowait((func, args, future))
+        except Full:
+            self.metrics.counter('log_queue_full').inc()
+            return None
+        self.queue_high_water = max(self.queue_high_water, self._queue.qsize())
+        return future
+
+    def _command(self, func, *args):
+        """Как _submit, но при заполненной очереди возвращает Future с ошибкой"""
+        future = self._submit(func, *args)
+        if future is None:
+            future = Future()
+            future.set_exception(RuntimeError("Очередь записи лога заполнена"))
+        return future
+
+    def _writer_loop(self):
+        """Поток записи: выполняет задачи из очереди по порядку"""
+        while True:
+            try:
+                item = self._queue.get(timeout=LOG_SAMPLE_POLL_INTERVAL if self._sources else None)
+            except Empty:
+                item = ()
+            if self._sources:
+                self._collect_samples()
+            if item is None:
+                self._save_samples()
+                break
+            if not item:
+                continue
+            func, args, future = item
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def subscribe(self, samples, device=None):
+        """
+        Начинает запись каждого отсчета из буфера опроса (начиная с новых)
+
+        :param samples: SampleRingBuffer контроллера
+        :param device: имя устройства (по умолчанию - устройство этого логгера)
+        :return: Future (ValueError, если под этим именем уже записывается другой буфер)
+        """
+        return self._command(self._subscribe, device or self.device, samples)
+
+    def unsubscribe(self, device=None):
+        """Прекращает запись отсчетов устройства, дописав уже собранные"""
+        return self._command(self._subscribe, device or self.device, None)
+
+    def _subscribe(self, device, samples):
+        source = self._sources.get(device)
+        if samples is not None and source is not None and source[0] is not samples:
+            raise ValueError(f"Устройство {device} уже записывается из другого буфера отсчетов")
+        if source is not None:
+            self._collect_samples()
+            self._save_samples()
+            del self._sources[device]
+        if samples is not None:
+            if not self._sources:
+                self._sample_save_time = time.monotonic()
+            self._sources[device] = [samples, samples.head, []]
+
+    def _collect_samples(self):
+        """Забирает новые отсчеты из буферов опроса (в потоке записи)"""
+        for device, source in self._sources.items():
+            samples, seq, rows = source
+            batch, source[1], dropped = samples.read(seq)
+            if dropped:
+                self.dropped_samples += dropped
+                self.metrics.counter('log_dropped_samples').inc(dropped)
+                logging.error(f"Лог {device} не успевает за опросом, пропущено отсчетов: {dropped}")
+            if len(batch):
+                rows.extend(sample_rows(batch))
+        if time.monotonic() - self._sample_save_time >= self.log_interval:
+            self._save_samples()
+
+    def add_burst(self, burst_id, samples):
+        """
+        Записывает серию измерений одной пачкой (в потоке записи)
+
+        :param burst_id: идентификатор серии (столбец Burst)
+        :param samples: массив отсчетов SAMPLE_DTYPE
+        :return: Future с числом записанных строк
+        """
+        return self._command(self._save_burst, burst_id, samples)
+
+    def _save_burst(self, burst_id, samples):
+        rows = sample_rows(samples, burst_id)
+        started = time.monotonic()
+        self.store.append(rows, device=self.device)
+        self._flush_histogram.record(time.monotonic() - started)
+        self.written_rows += len(rows)
+        logging.info(f"Серия {burst_id}: сохранено {len(rows)} измерений")
+        return len(rows)
+
+    def _save_samples(self):
+        self._sample_save_time = time.monotonic()
+        for device, source in self._sources.items():
+            rows = source[2]
+            if rows:
+                source[2] = []
+                self._save_data(rows, device)
+                self.logged_samples += len(rows)
+
+    def _save_data(self, rows, device=None):
+        """Дописывает пачку строк в конец журнала (в потоке записи)"""
+        try:
+            started = time.monotonic()
+            self.store.append(rows, device=device or self.device)
+            self._flush_histogram.record(time.monotonic() - started)
+            self.written_rows += len(rows)
+            logging.info(f"Данные успешно сохранены в {self.store.directory}")
+        except Exception as e:
+            self.metrics.counter('log_write_errors').inc()
+            logging.error(f"Ошибка при сохранении журнала: {e}")
+
+    def flush(self):
+        """Передает накопленные данные на запись, не дожидаясь ее окончания"""
+        if not self.log_data or self._closed:
+            return None
+        self.last_log_time = time.time()
+        future = self._submit(self._save_data, self.log_data)
+        if future is not None:
             self.log_data = []
+            return future
+
+        # Очередь заполнена: строки остаются в буфере до следующей попытки
+        self.deferred_flushes += 1
+        excess = len(self.log_data) - self.max_pending_rows
+        if excess > 0:
+            del self.log_data[:excess]
+            self.dropped_rows += excess
+            self.metrics.counter('log_dropped_rows').inc(excess)
+            logging.error(f"Запись лога не успевает, отброшено строк: {excess}")
+        return None
 
-    def _save_data(self):
-        """Сохранение накопленных данных в Excel файл"""
-        if not self.log_data:
+    def close(self, timeout=None):
+        """Сохраняет буфер, дожидается записи всех пачек и останавливает поток
+
+        :param timeout: общее ожидание места в очереди и записи, с (None - без ограничения)
+        """
+        if self._closed:
             return
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
 
         try:
-            # Создаем временный файл
-            temp_file = self.log_file.with_suffix('.tmp')
-
-            # Читаем существующие данные
-            if os.path.exists(self.log_file):
-                try:
-                    existing_data = pd.read_excel(self.log_file, engine='openpyxl')
-                except:
-                    existing_data = pd.DataFrame(columns=[
-                        "Timestamp",
-                        "Temperature (°C)",
-                        "Pressure (Pa)",
-                        "Position",
-                        "Status"
-                    ])
-            else:
-                existing_data = pd.DataFrame(columns=[
-                    "Timestamp",
-                    "Temperature (°C)",
-                    "Pressure (Pa)",
-                    "Position",
-                    "Status"
-                ])
-
-            # Добавляем новые данные
-            new_data = pd.DataFrame(self.log_data, columns=existing_data.columns)
-            combined_data = pd.concat([existing_data, new_data], ignore_index=True)
-
-            # Сохраняем во временный файл
-            combined_data.to_excel(temp_file, index=False, engine='openpyxl')
-
-            # Заменяем старый файл новым
-            if os.path.exists(self.log_file):
-                os.replace(temp_file, self.log_file)
+            if self.log_data:
+                # При закрытии ждем места в очереди, а не откладываем строки
+                self._queue.put((self._save_data, (self.log_data,), Future()), timeout=remaining())
+                self.log_data = []
+            self._queue.put(None, timeout=remaining())
+        except Full:
+            # Диск не успевает: поток записи (фоновый) не дожидаемся
+            if self.log_data:
+                self.dropped_rows += len(self.log_data)
+                self.metrics.counter('log_dropped_rows').inc(len(self.log_data))
+                logging.error(f"Запись лога не успевает, при закрытии отброшено строк: {len(self.log_data)}")
+                self.log_data = []
             else:
-                temp_file.rename(self.log_file)
+                logging.error("Запись лога не успевает, очередь не дописана при закрытии")
+            return
+        self._writer.join(remaining())
 
-            logging.info(f"Данные успешно сохранены в {self.log_file}")
+    def stats(self):
+        """Счетчики записи лога"""
+        return {
+            'pending_rows': len(self.log_data),
+            'queued_batches': self._queue.qsize(),
+            'queue_high_water': self.queue_high_water,
+            'written_rows': self.written_rows,
+            'deferred_flushes': self.deferred_flushes,
+            'dropped_rows': self.dropped_rows,
+            'logged_samples': self.logged_samples,
+            'dropped_samples': self.dropped_samples,
+        }
 
-        except Exception as e:
-            logging.error(f"Ошибка при сохранении в Excel: {e}")
+    def read_range(self, t0=None, t1=None, columns=None, device=None):
+        """
+        Чтение журнала за интервал времени (открываются только нужные сегменты)
+
+        Можно вызывать из любого потока, кроме потока Tk: читаются только
+        данные, уже записанные на диск.
+
+        :param t0: начало интервала (datetime, метка Unix или строка), None - без ограничения
+        :param t1: конец интервала включительно
+        :param columns: список нужных столбцов LOG_COLUMNS (по умолчанию - все)
+        :param device: устройство (по умолчанию - устройство этого логгера)
+        :return: pandas.DataFrame
+        """
+        import pandas as pd  # Загружается при первом чтении журнала, а не при запуске
+        self._ready.result()  # Хранилище открывается в потоке записи
+        data = self.store.read_range_bytes(t0, t1, device=device or self.device)
+        header = ','.join(LOG_COLUMNS).encode('utf-8') + b'\n'
+        return pd.read_csv(io.BytesIO(header + data), usecols=columns)
+
+    def export_xlsx(self, path=None, t0=None, t1=None):
+        """
+        Экспорт журнала в Excel по запросу (в потоке записи)
+
+        :param path: путь к файлу (по умолчанию logs/device_data_log.xlsx)
+        :param t0: начало интервала (по умолчанию - весь журнал)
+        :param t1: конец интервала
+        :return: Future с путем к созданному файлу
+        """
+        self.flush()
+        return self._command(self._export_xlsx, path, t0, t1)
+
+    def _export_xlsx(self, path, t0, t1):
+        path = Path(path) if path is not None else self.log_file
+        temp_file = path.with_suffix('.tmp')
+        try:
+            data = self.read_range(t0, t1)
+            data.to_excel(temp_file, index=False, engine='openpyxl')
+            os.replace(temp_file, path)
+            logging.info(f"Журнал экспортирован в {path}")
+            return path
+        finally:
             if os.path.exists(temp_file):
                 os.remove(temp_file)
 
-    def flush(self):
-        """Принудительное сохранение данных, если буфер не пуст"""
-        if self.log_data:
-            self._save_data()
-            self.log_data = []
-            self.last_log_time = time.time()
\ No newline at end of file
+
+def sample_rows(batch, burst_id=None):
+    """Строки журнала из массива отсчетов SAMPLE_DTYPE (поля без значения - None)"""
+    rows = []
+    for t_ns, status, pressure, temperature, position, fresh, valid in zip(
+            batch['t_ns'].tolist(), batch['status'].tolist(), batch['pressure'].tolist(),
+            batch['temperature'].tolist(), batch['position'].tolist(),
+            batch['fresh'].tolist(), batch['valid'].tolist()):
+        seconds, ns = divmod(t_ns, 1_000_000_000)
+        rows.append([
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds)) + f".{ns // 1_000_000:03d}",
+            temperature / 10.0 if valid & FIELD_TEMPERATURE else None,
+            pressure / 10.0 if valid & FIELD_PRESSURE else None,
+            position if valid & FIELD_POSITION else None,
+            status if valid & FIELD_STATUS else None,
+            t_ns,
+            fresh,
+            burst_id,
+        ])
+    return rows
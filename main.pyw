@@ -1,51 +1,49 @@
 """Основной модуль приложения"""
 
 import time
-import json
+_STARTED = time.perf_counter()  # До остальных импортов - для отчета о времени запуска
+
 import sys
-from pathlib import Path
+from config import load_config
+from constants import CONSOLE_MAX_LINES
 from device_controller import DeviceController
 from gui import DeviceGUI, GuiOutputRedirector
-
-
-def load_config(config_path="config.json"):
-    """Загрузка настроек устройства из JSON-файла"""
-    config_file = Path(config_path)
-    if not config_file.exists():
-        raise FileNotFoundError(f"Файл конфигурации не найден: {config_path}")
-    with open(config_file, "r") as f:
-        return json.load(f)
+from startup import StartupTimer
 
 
 def main():
     """Точка входа в приложение"""
+    timer = StartupTimer(_STARTED, expected=("окно", "графики", "подключение", "первый отсчет"))
+    timer.mark("импорт")
     config = load_config()
-    max_attempts = config.get("max_attempts", 5)
-    poll_interval = config.get("poll_interval_sec", 2)
+    # Окно показывает одно устройство: при списке "devices" - первое из него
+    device = (config.get("devices") or [config])[0]
 
     controller = DeviceController(
-        config["ip"],
-        port=config.get("port", 502),
-        device_id=config.get("device_id", 0x03)
+        device["ip"],
+        port=device.get("port", 502),
+        device_id=device.get("device_id", 0x03),
+        pipelined=device.get("pipelined", True),
+        adaptive_pacing=device.get("adaptive_pacing", False)
+    )
+    # Окно открывается сразу в состоянии «подключение...», связь
+    # устанавливается и восстанавливается в фоне
+    controller.connect(timeout=0)
+
+    app = DeviceGUI(
+        controller,
+        startup_timer=timer,
+        console_max_lines=config.get("console_max_lines", CONSOLE_MAX_LINES),
+        console_log=config.get("console_log")
     )
 
-    for attempt in range(1, max_attempts + 1):
-        if controller.connect():
-            app = DeviceGUI(controller)
-
-            # Перенаправляем stdout/stderr в GUI
-            sys.stdout = GuiOutputRedirector(app)
-            sys.stderr = GuiOutputRedirector(app)
+    # Перенаправляем stdout/stderr в GUI
+    sys.stdout = GuiOutputRedirector(app)
+    sys.stderr = GuiOutputRedirector(app)
 
-            controller.start_polling()
-            app.run()
-            break
-        print(f"Попытка {attempt} из {max_attempts} не удалась")
-        if attempt < max_attempts:
-            time.sleep(poll_interval)
-    else:
-        print("Не удалось подключиться к устройству после нескольких попыток")
+    controller.start_polling()
+    app.run()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
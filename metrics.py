@@ -0,0 +1,190 @@
+"""Модуль метрик: гистограммы задержек и счетчики событий горячих участков"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+HISTOGRAM_SUB_BITS = 7  # Значения до 2**7 мкс хранятся точно, дальше - 64 корзины на октаву
+HISTOGRAM_MAX_US = 1 << 36  # Верхняя граница значений (~19 ч), большие значения усекаются
+METRICS_DIR = Path("logs")
+
+_HALF = 1 << (HISTOGRAM_SUB_BITS - 1)
+
+
+def _bucket_index(value):
+    """Номер корзины для целого значения в микросекундах"""
+    shift = value.bit_length() - HISTOGRAM_SUB_BITS
+    if shift <= 0:
+        return value
+    return shift * _HALF + (value >> shift)
+
+
+def _bucket_bounds(index):
+    """Границы значений корзины [low, high] в микросекундах"""
+    if index < 2 * _HALF:
+        return index, index
+    shift = index // _HALF - 1
+    mantissa = index - shift * _HALF
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """Гистограмма задержек в духе HDR Histogram.
+
+    Значения хранятся в микросекундах в логарифмических диапазонах
+    (по степеням двойки), каждый из которых разбит на 64 линейные корзины,
+    поэтому относительная погрешность процентилей не превышает ~1.6%
+    при постоянной памяти и O(1) на запись.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._counts = [0] * (_bucket_index(HISTOGRAM_MAX_US) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = None
+
+    def record(self, seconds):
+        """Учитывает одно значение длительности в секундах"""
+        value = min(HISTOGRAM_MAX_US, max(0, int(seconds * 1_000_000)))
+        index = _bucket_index(value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_us += value
+            if self.min_us is None or value < self.min_us:
+                self.min_us = value
+            if self.max_us is None or value > self.max_us:
+                self.max_us = value
+
+    def percentile(self, q):
+        """Значение q-го процентиля, мс (None, если значений нет)"""
+        with self._lock:
+            return self._percentile(q)
+
+    def _percentile(self, q):
+        if not self.count:
+            return None
+        rank = max(1, int(round(q / 100 * self.count)))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                # Верхняя граница корзины, но не больше наблюдавшегося максимума
+                return min(_bucket_bounds(index)[1], self.max_us) / 1000
+        return self.max_us / 1000
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self.count = 0
+            self.total_us = 0
+            self.min_us = None
+            self.max_us = None
+
+    def snapshot(self):
+        """Сводка: число значений, мин/сред/макс и процентили, мс"""
+        with self._lock:
+            result = {
+                'count': self.count,
+                'min_ms': self.min_us / 1000 if self.min_us is not None else None,
+                'mean_ms': self.total_us / self.count / 1000 if self.count else None,
+                'max_ms': self.max_us / 1000 if self.max_us is not None else None,
+            }
+            for q in (50, 90, 99, 99.9):
+                result[f"p{q:g}_ms"] = self._percentile(q)
+        return result
+
+
+class Counter:
+    """Счетчик событий (повторы, переподключения, ошибки CRC и т.п.)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+
+class MetricsRegistry:
+    """Именованные гистограммы и счетчики одного компонента или приложения.
+
+    Метрики создаются при первом обращении. snapshot() можно вызывать
+    из любого потока, dump() записывает его в файл JSON по запросу.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.created = time.time()
+
+    def histogram(self, name):
+        """Гистограмма name (создается при первом обращении)"""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(name))
+        return histogram
+
+    def counter(self, name):
+        """Счетчик name (создается при первом обращении)"""
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(name, Counter(name))
+        return counter
+
+    def reset(self):
+        """Обнуляет все метрики (например, перед замером)"""
+        with self._lock:
+            metrics = list(self._histograms.values()) + list(self._counters.values())
+        for metric in metrics:
+            metric.reset()
+        self.created = time.time()
+
+    def snapshot(self):
+        """Текущие значения: {'counters': {...}, 'histograms': {...}}"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+        return {
+            'uptime_s': time.time() - self.created,
+            'counters': {name: counters[name].value for name in sorted(counters)},
+            'histograms': {name: histograms[name].snapshot() for name in sorted(histograms)},
+        }
+
+    def dump(self, path=None):
+        """Записывает снимок метрик в JSON, возвращает путь к файлу"""
+        return dump_metrics({'metrics': self}, path)
+
+
+def dump_metrics(registries, path=None):
+    """
+    Записывает снимки нескольких реестров в один файл JSON
+
+    :param registries: {имя раздела: MetricsRegistry или словарь готовой статистики}
+    :param path: путь к файлу (по умолчанию logs/metrics_<дата-время>.json)
+    :return: путь к записанному файлу
+    """
+    path = Path(path) if path is not None else METRICS_DIR / f"metrics_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    report = {'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    for name, section in registries.items():
+        report[name] = section.snapshot() if isinstance(section, MetricsRegistry) else section
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = path.with_suffix('.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(temp_file, path)
+    return path
@@ -0,0 +1,83 @@
+"""Модуль адаптивного темпа запросов к устройству"""
+
+import threading
+from collections import deque
+
+from constants import PACING_MIN_GAP, PACING_MAX_GAP, PACING_WINDOW
+
+
+class AdaptivePacer:
+    """Подбирает паузу между запросами по RTT и доле ошибок устройства.
+
+    Пока ответы приходят без ошибок, пауза плавно уменьшается
+    (мультипликативно, каждые decrease_every успешных транзакций).
+    При таймауте или отброшенном кадре пауза удваивается, так что темп
+    быстро откатывается к тому, что устройство выдерживает.
+    """
+
+    def __init__(self, initial_gap, min_gap=PACING_MIN_GAP, max_gap=PACING_MAX_GAP,
+                 window=PACING_WINDOW, decrease_factor=0.9, decrease_every=20):
+        self.gap = initial_gap
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.decrease_factor = decrease_factor
+        self.decrease_every = decrease_every
+        self._rtts = deque(maxlen=window)  # RTT успешных транзакций, с
+        self._outcomes = deque(maxlen=window)  # None при успехе или вид ошибки
+        self._lock = threading.Lock()
+        self._streak = 0  # Успешных транзакций подряд
+        self.successes = 0
+        self.timeouts = 0
+        self.rejects = 0  # Кадры с неверной CRC/адресом и ресинхронизации
+
+    def record_success(self, rtt):
+        """Учитывает успешную транзакцию с временем ответа rtt секунд"""
+        with self._lock:
+            self.successes += 1
+            self._rtts.append(rtt)
+            self._outcomes.append(None)
+            self._streak += 1
+            if self._streak >= self.decrease_every:
+                self._streak = 0
+                self.gap = max(self.min_gap, self.gap * self.decrease_factor)
+
+    def record_error(self, kind):
+        """Учитывает ошибку: 'timeout' или 'reject'"""
+        with self._lock:
+            if kind == 'timeout':
+                self.timeouts += 1
+            else:
+                self.rejects += 1
+            self._outcomes.append(kind)
+            self._streak = 0
+            # Минимальный шаг, чтобы выйти из нулевой паузы
+            self.gap = min(self.max_gap, max(self.gap * 2, self.min_gap, 0.001))
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return None
+        index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+        return values[index]
+
+    def stats(self):
+        """Текущий темп, процентили RTT и доля ошибок по скользящему окну"""
+        with self._lock:
+            rtts = sorted(self._rtts)
+            outcomes = list(self._outcomes)
+            gap = self.gap
+        errors = [o for o in outcomes if o is not None]
+        mean_rtt = sum(rtts) / len(rtts) if rtts else None
+        p50, p90, p99 = (self._percentile(rtts, q) for q in (50, 90, 99))
+        return {
+            'gap_ms': gap * 1000,
+            'rate_hz': 1.0 / (gap + mean_rtt) if mean_rtt is not None and gap + mean_rtt > 0 else None,
+            'rtt_p50_ms': p50 * 1000 if p50 is not None else None,
+            'rtt_p90_ms': p90 * 1000 if p90 is not None else None,
+            'rtt_p99_ms': p99 * 1000 if p99 is not None else None,
+            'error_rate': len(errors) / len(outcomes) if outcomes else 0.0,
+            'timeout_rate': errors.count('timeout') / len(outcomes) if outcomes else 0.0,
+            'successes': self.successes,
+            'timeouts': self.timeouts,
+            'rejects': self.rejects,
+        }
@@ -0,0 +1,55 @@
+"""Модуль подготовки данных графиков: прореживание и пределы осей"""
+
+import numpy as np
+
+
+def minmax_decimate(x, low, high, x0, x1, columns):
+    """
+    Прореживание по min/max до ширины оси в пикселях
+
+    Точки раскладываются по columns столбцам оси X, для каждого столбца
+    выдаются две вершины (x, min) и (x, max). Линия выглядит так же, как
+    при отрисовке всех точек (выбросы не теряются), но вершин не больше
+    2 * columns при любом числе исходных точек.
+
+    :param x: координаты X по возрастанию
+    :param low: минимумы точек (для сырых отсчетов - сами значения)
+    :param high: максимумы точек (для сырых отсчетов - тот же массив low)
+    :param x0: левая граница оси
+    :param x1: правая граница оси
+    :param columns: число столбцов (ширина оси в пикселях)
+    :return: (x, y) для Line2D.set_data
+    """
+    columns = max(1, int(columns))
+    if len(x) <= columns:
+        if low is high:
+            return x, low
+        return np.repeat(x, 2), np.column_stack((low, high)).ravel()
+
+    scale = columns / (x1 - x0)
+    column = np.clip(((x - x0) * scale).astype(np.int64), 0, columns - 1)
+    starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    lows = np.minimum.reduceat(low, starts)
+    highs = np.maximum.reduceat(high, starts)
+    xs = x0 + (column[starts] + 0.5) / scale
+    return np.repeat(xs, 2), np.column_stack((lows, highs)).ravel()
+
+
+def hysteresis_limits(current, low, high, margin=0.1, min_fill=0.5):
+    """
+    Новые пределы оси Y или None, если текущие еще подходят
+
+    Новые пределы - данные с запасом margin с каждой стороны. Они
+    применяются, только если данные вышли за текущие пределы или новые
+    пределы меньше min_fill высоты текущих, поэтому при плавном изменении
+    сигнала ось перестраивается редко.
+
+    :param current: текущие пределы (y0, y1)
+    :param low: минимум данных
+    :param high: максимум данных
+    """
+    pad = (high - low) * margin or max(abs(high) * margin, 1.0)
+    y0, y1 = current
+    if y0 <= low and high <= y1 and (high - low + 2 * pad) >= min_fill * (y1 - y0):
+        return None
+    return low - pad, high + pad
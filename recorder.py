@@ -0,0 +1,163 @@
+"""Консольный регистратор без GUI (для работы в фоне, например как служба systemd)
+
+Опрашивает одно или несколько устройств из config.json, пишет каждый
+отсчет в журнал logs/ и периодически печатает частоту опроса и задержки.
+Модули интерфейса (tkinter, matplotlib) не импортируются.
+
+Пример: python recorder.py --config config.json --stats-interval 10
+"""
+
+import argparse
+import logging
+import signal
+import sys
+import threading
+import time
+
+from async_poller import AsyncDevicePoller, controllers_from_config
+from config import load_config
+from connection import STATE_CONNECTED
+from logger import DataLogger
+from metrics import dump_metrics
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Регистратор данных устройств без GUI")
+    parser.add_argument("--config", default="config.json", help="файл конфигурации (по умолчанию config.json)")
+    parser.add_argument("--log-dir", default="logs", help="каталог журнала (по умолчанию logs)")
+    parser.add_argument("--flush-interval", type=float, default=10.0,
+                        help="период сохранения журнала на диск, с (по умолчанию 10)")
+    parser.add_argument("--stats-interval", type=float, default=10.0,
+                        help="период вывода статистики, с (по умолчанию 10, 0 - не выводить)")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="остановиться через указанное число секунд")
+    parser.add_argument("--async-poller", action="store_true",
+                        help="опрашивать все устройства в одном потоке asyncio")
+    parser.add_argument("--metrics-file", default=None,
+                        help="файл JSON для метрик: пишется при завершении и по сигналу SIGUSR1")
+    return parser.parse_args(argv)
+
+
+class StatsReporter:
+    """Считает частоту отсчетов между отчетами и формирует строки статистики"""
+
+    def __init__(self, controllers, logger, use_connection=True):
+        self.controllers = controllers
+        self.logger = logger
+        self.use_connection = use_connection
+        self._last = {id(c): (time.monotonic(), c.samples.head) for c in controllers}
+
+    def lines(self):
+        now = time.monotonic()
+        result = []
+        for c in self.controllers:
+            last_time, last_head = self._last[id(c)]
+            head = c.samples.head
+            rate = (head - last_head) / (now - last_time) if now > last_time else 0.0
+            self._last[id(c)] = (now, head)
+
+            parts = [f"[{c.ip}:{c.port}]"]
+            if self.use_connection:
+                state = c.connection.state
+                parts.append("связь есть" if state == STATE_CONNECTED else f"связь: {state}")
+            parts.append(f"отсчеты {rate:.1f}/с (всего {head})")
+            if self.use_connection:
+                pacing = c.pacer.stats()
+                if pacing['rtt_p50_ms'] is not None:
+                    parts.append(f"RTT p50/p99 {pacing['rtt_p50_ms']:.1f}/{pacing['rtt_p99_ms']:.1f} мс")
+                parts.append(f"ошибки {pacing['error_rate'] * 100:.1f}%")
+            result.append(" | ".join(parts))
+
+        stats = self.logger.stats()
+        result.append(f"[лог] записано {stats['logged_samples']}, потеряно {stats['dropped_samples']}, "
+                      f"в очереди {stats['queued_batches']}")
+        return result
+
+
+def write_metrics(path, controllers, logger):
+    """Сохраняет метрики всех устройств и лога в один файл"""
+    sections = {c.log_name: c.metrics for c in controllers}
+    sections['log'] = logger.metrics
+    sections['log_stats'] = logger.stats()
+    try:
+        print(f"Метрики сохранены в {dump_metrics(sections, path)}", flush=True)
+    except OSError as e:
+        print(f"Ошибка сохранения метрик: {e}", file=sys.stderr)
+
+
+def main(argv=None):
+    """Точка входа регистратора, возвращает код завершения"""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка загрузки конфигурации: {e}", file=sys.stderr)
+        return 2
+
+    controllers = controllers_from_config(config)
+    logger = DataLogger(log_interval=args.flush_interval, log_dir=args.log_dir,
+                        device=controllers[0].log_name)
+    try:
+        for controller in controllers:
+            logger.subscribe(controller.samples, device=controller.log_name).result()
+    except ValueError as e:
+        print(f"Ошибка конфигурации: {e}", file=sys.stderr)
+        logger.close()
+        return 2
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop.set())
+    dump_requested = threading.Event()
+    if args.metrics_file and hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump_requested.set())
+
+    poller = None
+    if args.async_poller:
+        poller = AsyncDevicePoller(controllers)
+        poller.start()
+    else:
+        for controller in controllers:
+            controller.connect(timeout=0)  # Подключение продолжается в фоне
+            controller.start_polling()
+    print(f"Регистратор запущен: устройств {len(controllers)}, журнал {args.log_dir}", flush=True)
+
+    reporter = StatsReporter(controllers, logger, use_connection=poller is None)
+    started = time.monotonic()
+    finish = started + args.duration if args.duration is not None else None
+    next_report = started + args.stats_interval if args.stats_interval > 0 else None
+    while not stop.is_set():
+        now = time.monotonic()
+        if finish is not None and now >= finish:
+            break
+        # Ожидание ограничено секундой, чтобы сигнал обрабатывался без задержки
+        wait = min([1.0] + [t - now for t in (finish, next_report) if t is not None])
+        if stop.wait(max(0.0, wait)):
+            break
+        if dump_requested.is_set():
+            dump_requested.clear()
+            write_metrics(args.metrics_file, controllers, logger)
+        if next_report is not None and time.monotonic() >= next_report:
+            next_report += args.stats_interval
+            for line in reporter.lines():
+                print(line, flush=True)
+
+    print("Остановка регистратора...", flush=True)
+    if poller is not None:
+        poller.stop(timeout=5)
+    for controller in controllers:
+        controller.stop_polling()
+    logger.close(timeout=30)  # Дописываем собранные отсчеты
+    for controller in controllers:
+        controller.disconnect()
+    for line in reporter.lines():
+        print(line, flush=True)
+    if args.metrics_file:
+        write_metrics(args.metrics_file, controllers, logger)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
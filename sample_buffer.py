@@ -0,0 +1,123 @@
+"""Модуль кольцевого буфера отсчетов опроса"""
+
+import time
+
+import numpy as np
+
+from constants import (
+    REG_STATUS, REG_MEASURED_PRESSURE, REG_TEMPERATURE, REG_POSITION_LO, REG_POSITION_HI
+)
+
+# Флаги полей отсчета (маски fresh и valid)
+FIELD_STATUS = 0x01
+FIELD_PRESSURE = 0x02
+FIELD_TEMPERATURE = 0x04
+FIELD_POSITION = 0x08
+
+# Регистры, из которых собирается отсчет
+POLLED_REGISTERS = (REG_STATUS, REG_MEASURED_PRESSURE, REG_TEMPERATURE, REG_POSITION_LO, REG_POSITION_HI)
+
+SAMPLE_DTYPE = np.dtype([
+    ('t_mono', 'f8'),  # time.monotonic() завершения цикла опроса, с
+    ('t_ns', 'i8'),  # time.time_ns() того же момента, для журнала
+    ('status', 'u2'),
+    ('pressure', 'u2'),  # Сырое значение, Па * 10
+    ('temperature', 'u2'),  # Сырое значение, °C * 10
+    ('position', 'u4'),  # (HI << 16) | LO из одного цикла опроса
+    ('fresh', 'u1'),  # Поля, прочитанные в этом цикле
+    ('valid', 'u1'),  # Поля, для которых уже есть значение
+])
+
+
+class SampleRingBuffer:
+    """Предвыделенный кольцевой буфер полных отсчетов опроса.
+
+    Пишет один поток (поток опроса), читать могут несколько потребителей
+    без блокировок: каждый хранит номер следующего нужного отсчета и
+    забирает пачку новых отсчетов одним массивом NumPy. Номер отсчета
+    публикуется только после записи всех его полей. Если потребитель
+    отстал больше чем на емкость буфера, старые отсчеты теряются и
+    возвращается их количество.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=SAMPLE_DTYPE)
+        self.head = 0  # Номер следующего записываемого отсчета
+        self._last = {}
+        self._valid = 0
+
+    def append(self, values, t_mono=None, t_ns=None):
+        """Собирает отсчет из значений регистров одного цикла опроса.
+
+        :param values: словарь {адрес: значение или None}
+        :param t_mono: момент отсчета (по умолчанию - текущий)
+        :param t_ns: время отсчета по часам, нс (по умолчанию - текущее)
+        """
+        fresh = 0
+        for field, addr in ((FIELD_STATUS, REG_STATUS),
+                            (FIELD_PRESSURE, REG_MEASURED_PRESSURE),
+                            (FIELD_TEMPERATURE, REG_TEMPERATURE)):
+            value = values.get(addr)
+            if value is not None:
+                self._last[addr] = value
+                fresh |= field
+
+        # Позиция обновляется только если обе половины прочитаны в этом цикле
+        lo = values.get(REG_POSITION_LO)
+        hi = values.get(REG_POSITION_HI)
+        if lo is not None and hi is not None:
+            self._last['position'] = (hi << 16) | lo
+            fresh |= FIELD_POSITION
+
+        if not fresh:
+            return None
+        self._valid |= fresh
+
+        seq = self.head
+        self._data[seq % self.capacity] = (
+            time.monotonic() if t_mono is None else t_mono,
+            time.time_ns() if t_ns is None else t_ns,
+            self._last.get(REG_STATUS, 0),
+            self._last.get(REG_MEASURED_PRESSURE, 0),
+            self._last.get(REG_TEMPERATURE, 0),
+            self._last.get('position', 0),
+            fresh,
+            self._valid,
+        )
+        self.head = seq + 1  # Публикация отсчета
+        return seq
+
+    def read(self, since, max_count=None):
+        """Возвращает (массив отсчетов, номер следующего отсчета, число потерянных).
+
+        :param since: номер первого нужного отсчета
+        :param max_count: ограничение размера пачки (берутся самые ранние)
+        """
+        head = self.head
+        start = max(since, head - self.capacity)
+        end = head if max_count is None else min(head, start + max_count)
+        if start >= end:
+            return self._data[:0].copy(), max(since, end), start - since
+
+        first = start % self.capacity
+        last = end % self.capacity
+        if first < last:
+            batch = self._data[first:last].copy()
+        else:
+            batch = np.concatenate((self._data[first:], self._data[:last]))
+
+        # Отсчеты, перезаписанные писателем во время копирования (включая
+        # записываемый сейчас), отбрасываются
+        overwritten = self.head + 1 - self.capacity - start
+        if overwritten > 0:
+            batch = batch[overwritten:]
+            start += overwritten
+        return batch, end, start - since
+
+    def latest(self):
+        """Последний отсчет или None, если отсчетов еще нет"""
+        head = self.head
+        if head == 0:
+            return None
+        return self._data[(head - 1) % self.capacity].copy()
@@ -0,0 +1,110 @@
+"""Модуль планирования опроса регистров по дедлайнам"""
+
+import threading
+import time
+
+
+class RegisterStats:
+    """Статистика опроса одного регистра: фактическая частота и джиттер"""
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.last_time = None
+        self.rate_hz = 0.0  # Сглаженная фактическая частота
+        self.jitter_ms = 0.0  # Сглаженное отклонение момента чтения от дедлайна
+        self.max_jitter_ms = 0.0
+        self._alpha = 0.1
+
+    def update(self, now, deadline):
+        """Учитывает чтение, выполненное в момент now для дедлайна deadline"""
+        lateness_ms = max(0.0, now - deadline) * 1000 if deadline is not None else 0.0
+        if self.last_time is not None and now > self.last_time:
+            rate = 1.0 / (now - self.last_time)
+            self.rate_hz = rate if self.count == 1 else self.rate_hz + self._alpha * (rate - self.rate_hz)
+        self.jitter_ms += self._alpha * (lateness_ms - self.jitter_ms)
+        self.max_jitter_ms = max(self.max_jitter_ms, lateness_ms)
+        self.last_time = now
+        self.count += 1
+
+    def as_dict(self):
+        return {
+            'period_s': self.period,
+            'target_hz': 1.0 / self.period if self.period else None,
+            'rate_hz': self.rate_hz,
+            'jitter_ms': self.jitter_ms,
+            'max_jitter_ms': self.max_jitter_ms,
+            'count': self.count,
+        }
+
+
+class PollScheduler:
+    """Планировщик опроса с индивидуальным периодом для каждого регистра.
+
+    Дедлайны считаются по time.monotonic() и сдвигаются ровно на период,
+    а не от момента фактического чтения, поэтому опрос не дрейфует.
+    Если чтение опоздало больше чем на период, пропущенные дедлайны
+    отбрасываются, а не выполняются пачкой. Регистры с периодом None
+    читаются только по запросу request().
+    """
+
+    def __init__(self, periods):
+        """
+        :param periods: словарь {адрес регистра: период в секундах или None}
+        """
+        self._lock = threading.Lock()
+        self.wakeup = threading.Event()  # Устанавливается при запросе по требованию
+        self.set_periods(periods)
+
+    def set_periods(self, periods):
+        """Задает новую таблицу периодов (дедлайны начинаются заново)"""
+        now = time.monotonic()
+        with self._lock:
+            self.periods = dict(periods)
+            self.deadlines = {addr: now for addr, period in self.periods.items() if period}
+            self.stats = {addr: RegisterStats(period) for addr, period in self.periods.items()}
+            self._requested = set()
+        self.wakeup.set()
+
+    def request(self, *addresses):
+        """Запрашивает внеочередное чтение регистров"""
+        with self._lock:
+            self._requested.update(addresses)
+        self.wakeup.set()
+
+    def due(self, now=None):
+        """Возвращает (список регистров к чтению, время до ближайшего дедлайна)"""
+        self.wakeup.clear()
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due = [addr for addr, deadline in self.deadlines.items() if deadline <= now]
+            due += [addr for addr in self._requested if addr not in due]
+            self._requested.clear()
+            if self.deadlines:
+                wait = max(0.0, min(self.deadlines.values()) - now)
+            else:
+                wait = None
+        return due, wait
+
+    def complete(self, addresses, now=None):
+        """Отмечает выполненные чтения и переносит их дедлайны"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for addr in addresses:
+                deadline = self.deadlines.get(addr)
+                stats = self.stats.get(addr)
+                if stats is not None:
+                    stats.update(now, deadline)
+                if deadline is None:
+                    continue
+                period = self.periods[addr]
+                deadline += period
+                if deadline <= now:
+                    # Пропускаем просроченные дедлайны, сохраняя сетку
+                    deadline += period * (int((now - deadline) / period) + 1)
+                self.deadlines[addr] = deadline
+
+    def report(self):
+        """Фактическая частота и джиттер по каждому регистру"""
+        with self._lock:
+            return {addr: stats.as_dict() for addr, stats in self.stats.items()}
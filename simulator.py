@@ -0,0 +1,356 @@
+"""Симулятор устройства: TCP-сервер с тем же 5-байтовым протоколом
+
+Модель заслонки: позиция плавно движется по командам CMD_OPEN, CMD_CLOSE,
+CMD_MIDDLE_POSITION и CMD_POSITION, давление в режиме стабилизации
+(CMD_START) следует за уставкой, а без нее определяется открытием заслонки.
+Неисправности канала (задержка, джиттер, потерянные байты, ошибки CRC,
+разрывы соединения) задаются параметрами FaultConfig.
+
+Пример: python simulator.py --port 15020 --count 4 --latency 0.002 --crc-error-rate 0.01
+Затем в config.json: {"ip": "127.0.0.1", "port": 15020, "device_id": 3}
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import threading
+import time
+
+import codec
+from crc import crc7_generate
+from constants import (
+    DEFAULT_DEVICE_ID, REG_STATUS, REG_MEASURED_PRESSURE, REG_TEMPERATURE, REG_POSITION_LO,
+    REG_POSITION_HI, REG_COMMAND, REG_SET_PRESSURE, REG_SET_POSITION,
+    CMD_START, CMD_OPEN, CMD_CLOSE, CMD_POSITION, CMD_MIDDLE_POSITION, CMD_STOP
+)
+from framer import FrameReader, FRAME_SIZE, FRAME_MARKER
+
+# Биты регистра статуса (в порядке флагов GUI)
+STATUS_STAB = 0x001
+STATUS_OPEN = 0x002
+STATUS_CLOSE = 0x004
+STATUS_POSITION = 0x008
+STATUS_ERROR = 0x080
+STATUS_PING = 0x200
+
+POSITION_FULL = 20000  # Позиция полностью открытой заслонки, шаги
+POSITION_SPEED = 10000  # Скорость заслонки, шаги/с
+PRESSURE_MAX = 1000.0  # Давление при закрытой заслонке, Па
+PRESSURE_TAU = 0.5  # Постоянная времени давления, с
+TEMPERATURE = 23.5  # Температура, °C
+
+
+class FaultConfig:
+    """Параметры неисправностей канала (вероятности - на один ответ)"""
+
+    def __init__(self, latency=0.0, jitter=0.0, drop_rate=0.0, crc_error_rate=0.0,
+                 disconnect_rate=0.0, seed=None):
+        self.latency = latency  # Задержка ответа, с
+        self.jitter = jitter  # Случайная добавка к задержке 0..jitter, с
+        self.drop_rate = drop_rate  # Потеря одного байта ответа
+        self.crc_error_rate = crc_error_rate  # Искажение CRC ответа
+        self.disconnect_rate = disconnect_rate  # Разрыв соединения вместо ответа
+        self.random = random.Random(seed)
+
+
+class SimulatedDevice:
+    """Состояние и физическая модель одного устройства"""
+
+    def __init__(self, device_id=DEFAULT_DEVICE_ID, seed=None):
+        self.device_id = device_id & 0x07
+        self.random = random.Random(seed)
+        self.position = 0.0
+        self.target = None  # Позиция, к которой движется заслонка
+        self.stab = False
+        self.set_pressure = 0
+        self.set_position = 0
+        self.pressure = PRESSURE_MAX
+        self.last_command = 0
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.writes = 0
+
+    def step(self, now=None):
+        """Продвигает модель до момента now"""
+        now = time.monotonic() if now is None else now
+        dt = max(0.0, now - self.updated)
+        self.updated = now
+        if self.target is not None:
+            delta = self.target - self.position
+            move = POSITION_SPEED * dt
+            if abs(delta) <= move:
+                self.position = float(self.target)
+                self.target = None
+            else:
+                self.position += move if delta > 0 else -move
+
+        if self.stab:
+            goal = self.set_pressure / 10.0
+        else:
+            goal = PRESSURE_MAX * (1.0 - self.position / POSITION_FULL)
+        self.pressure += (goal - self.pressure) * (1.0 - math.exp(-dt / PRESSURE_TAU))
+
+    def status(self):
+        status = STATUS_PING
+        if self.stab:
+            status |= STATUS_STAB
+        if self.target is None and self.position >= POSITION_FULL:
+            status |= STATUS_OPEN
+        if self.target is None and self.position <= 0:
+            status |= STATUS_CLOSE
+        if self.target is not None:
+            status |= STATUS_POSITION
+        return status
+
+    def read(self, address):
+        """Значение регистра (16 бит)"""
+        self.step()
+        position = int(round(self.position))
+        if address == REG_STATUS:
+            return self.status()
+        if address == REG_MEASURED_PRESSURE:
+            noise = self.random.uniform(-0.2, 0.2)
+            return max(0, min(0xFFFF, int(round((self.pressure + noise) * 10))))
+        if address == REG_TEMPERATURE:
+            return int(round((TEMPERATURE + self.random.uniform(-0.1, 0.1)) * 10))
+        if address == REG_POSITION_LO:
+            return position & 0xFFFF
+        if address == REG_POSITION_HI:
+            return (position >> 16) & 0xFFFF
+        if address == REG_COMMAND:
+            return self.last_command
+        if address == REG_SET_PRESSURE:
+            return self.set_pressure
+        if address == REG_SET_POSITION:
+            return self.set_position
+        return 0
+
+    def write(self, address, value):
+        """Запись регистра; возвращает записанное значение"""
+        self.step()
+        self.writes += 1
+        if address == REG_SET_PRESSURE:
+            self.set_pressure = value
+        elif address == REG_SET_POSITION:
+            self.set_position = value
+        elif address == REG_COMMAND:
+            self.command(value)
+        return value
+
+    def command(self, cmd):
+        self.last_command = cmd
+        if cmd == CMD_START:
+            self.stab = True
+            self.target = None
+        elif cmd == CMD_STOP:
+            self.stab = False
+            self.target = None
+        elif cmd == CMD_OPEN:
+            self.stab = False
+            self.target = POSITION_FULL
+        elif cmd == CMD_CLOSE:
+            self.stab = False
+            self.target = 0
+        elif cmd == CMD_MIDDLE_POSITION:
+            self.stab = False
+            self.target = POSITION_FULL // 2
+        elif cmd == CMD_POSITION:
+            self.stab = False
+            self.target = max(0, min(POSITION_FULL, self.set_position))
+        # CMD_SAVE_FLASH и CMD_SOUND на модель не влияют
+
+    def handle(self, frame):
+        """Ответный кадр на кадр запроса или None (чужое устройство)"""
+        if (frame[0] & 0x07) != self.device_id:
+            return None
+        address = frame[1] & 0x7F
+        self.requests += 1
+        if frame[0] & codec.WRITE_FLAG:
+            data = ((frame[0] >> 3) & 0x03) << 14 | (frame[2] & 0x7F) << 7 | frame[3] & 0x7F
+            return self.response(address, self.write(address, data))
+        return self.response(address, self.read(address))
+
+    def response(self, address, value):
+        """Ответный кадр: старшие биты данных в битах 5..4 первого байта (см. codec.decode)"""
+        header = bytes([FRAME_MARKER | ((value >> 14) & 0x03) << 4 | self.device_id,
+                        address & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+        return header + bytes([crc7_generate(header)])
+
+
+class DeviceServer:
+    """TCP-сервер одного симулированного устройства"""
+
+    def __init__(self, device, port=0, host="127.0.0.1", faults=None):
+        self.device = device
+        self.host = host
+        self.port = port
+        self.faults = faults or FaultConfig()
+        self.server = None
+        self.connections = 0
+        self._clients = {}  # Задача обработчика соединения -> writer
+        self.faults_injected = {'drop': 0, 'crc': 0, 'disconnect': 0}
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Закрывает сервер и все клиентские соединения.
+
+        Клиенты видят разрыв соединения, а обработчики завершаются до
+        остановки цикла событий (иначе - "Task was destroyed but it is pending").
+        """
+        if self.server is not None:
+            self.server.close()
+        clients = list(self._clients.items())
+        for task, writer in clients:
+            writer.close()
+            task.cancel()
+        if clients:
+            await asyncio.gather(*(task for task, _ in clients), return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        framer = FrameReader()
+        faults = self.faults
+        try:
+            while True:
+                chunk = await reader.read(FRAME_SIZE * 16)
+                if not chunk:
+                    break
+                framer.feed(chunk)
+                frame = framer.next_frame()
+                while frame is not None:
+                    response = self.device.handle(frame)
+                    frame = framer.next_frame()
+                    if response is None:
+                        continue
+
+                    delay = faults.latency + faults.random.uniform(0, faults.jitter)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if faults.random.random() < faults.disconnect_rate:
+                        self.faults_injected['disconnect'] += 1
+                        return
+                    if faults.random.random() < faults.crc_error_rate:
+                        self.faults_injected['crc'] += 1
+                        response = response[:4] + bytes([response[4] ^ 0x01])
+                    if faults.random.random() < faults.drop_rate:
+                        self.faults_injected['drop'] += 1
+                        index = faults.random.randrange(FRAME_SIZE)
+                        response = response[:index] + response[index + 1:]
+                    writer.write(response)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            del self._clients[task]
+            writer.close()
+
+
+class Simulator:
+    """Несколько симулированных устройств на последовательных портах.
+
+    Может работать в отдельном потоке (start/stop) - для тестов и замеров
+    из того же процесса, что и DeviceController.
+    """
+
+    def __init__(self, count=1, port=0, device_id=DEFAULT_DEVICE_ID, host="127.0.0.1",
+                 faults=None, seed=None):
+        """
+        :param port: порт первого устройства (0 - свободные порты, выбранные системой)
+        """
+        self.servers = [
+            DeviceServer(SimulatedDevice(device_id, seed=None if seed is None else seed + i),
+                         port=port + i if port else 0, host=host, faults=faults)
+            for i in range(count)
+        ]
+        self.loop = None
+        self.t = threading.Thread()
+        self._ready = threading.Event()
+
+    @property
+    def ports(self):
+        return [server.port for server in self.servers]
+
+    async def serve(self, stop_event=None):
+        """Запускает все серверы в текущем цикле событий"""
+        for server in self.servers:
+            await server.start()
+        self._ready.set()
+        try:
+            if stop_event is None:
+                await asyncio.Event().wait()
+            else:
+                await stop_event.wait()
+        finally:
+            for server in self.servers:
+                await server.stop()
+
+    def start(self, timeout=5.0):
+        """Запускает серверы в фоновом потоке и возвращает список портов"""
+        self.loop = asyncio.new_event_loop()
+        self._stop = asyncio.Event()
+        self.t = threading.Thread(target=self._run, name="simulator", daemon=True)
+        self.t.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("Симулятор не запустился")
+        return self.ports
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.serve(self._stop))
+        finally:
+            self.loop.close()
+
+    def stop(self, timeout=5.0):
+        if self.loop is not None and self.t.is_alive():
+            self.loop.call_soon_threadsafe(self._stop.set)
+            self.t.join(timeout)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Симулятор устройства FlowSensor")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=15020, help="порт первого устройства")
+    parser.add_argument("--count", type=int, default=1, help="число устройств (порты подряд)")
+    parser.add_argument("--device-id", type=int, default=DEFAULT_DEVICE_ID)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, с")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="доля ответов с потерянным байтом")
+    parser.add_argument("--crc-error-rate", type=float, default=0.0, help="доля ответов с неверной CRC")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="доля ответов с разрывом соединения")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    faults = FaultConfig(args.latency, args.jitter, args.drop_rate, args.crc_error_rate,
+                         args.disconnect_rate, seed=args.seed)
+    simulator = Simulator(args.count, args.port, args.device_id, args.host, faults, seed=args.seed)
+
+    async def run():
+        task = asyncio.ensure_future(simulator.serve())
+        await asyncio.sleep(0)
+        while not simulator._ready.is_set() and not task.done():
+            await asyncio.sleep(0.01)
+        if task.done():
+            task.result()
+        print(f"Симулятор: устройств {args.count}, порты {', '.join(map(str, simulator.ports))}", flush=True)
+        await task
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
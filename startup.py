@@ -0,0 +1,69 @@
+"""Модуль замера времени запуска приложения"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+STARTUP_LOG = Path("logs") / "startup_times.jsonl"
+
+
+class StartupTimer:
+    """Отметки этапов запуска в миллисекундах от начала процесса.
+
+    Отчет формируется один раз: когда пройдены все ожидаемые этапы
+    или по вызову finish(). Каждый отчет дописывается строкой JSON
+    в logs/startup_times.jsonl, чтобы замечать замедление запуска;
+    запись выполняет короткоживущий фоновый поток, а не поток Tk.
+    """
+
+    def __init__(self, started=None, expected=()):
+        """
+        :param started: time.perf_counter() начала процесса
+        :param expected: этапы, после которых отчет формируется автоматически
+        """
+        self.started = time.perf_counter() if started is None else started
+        self.expected = set(expected)
+        self.marks = {}
+        self.finished = False
+        self._writer = None
+
+    def mark(self, name):
+        """Отмечает этап (повторные отметки игнорируются)"""
+        if self.finished or name in self.marks:
+            return
+        self.marks[name] = (time.perf_counter() - self.started) * 1000
+        if self.expected and self.expected <= self.marks.keys():
+            self.finish()
+
+    def report(self):
+        """Строка отчета: этапы по порядку с временем от начала"""
+        stages = ", ".join(f"{name} {ms:.0f} мс" for name, ms in self.marks.items())
+        return f"Время запуска: {stages}"
+
+    def finish(self, path=STARTUP_LOG):
+        """Печатает отчет и передает его на запись в журнал времени запуска (в фоне)"""
+        if self.finished:
+            return
+        self.finished = True
+        print(self.report())
+        record = {'time': datetime.now().isoformat(timespec='seconds'),
+                  'marks_ms': {name: round(ms, 1) for name, ms in self.marks.items()}}
+        self._writer = threading.Thread(target=self._save, args=(Path(path), record),
+                                        name="startup-log", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _save(path, record):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"Не удалось сохранить время запуска: {e}")
+
+    def wait(self, timeout=None):
+        """Дожидается записи отчета (например, перед выходом из процесса)"""
+        if self._writer is not None:
+            self._writer.join(timeout)
@@ -0,0 +1,373 @@
+"""Модуль хранения журнала измерений в CSV-сегментах с дозаписью"""
+
+import csv
+import io
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"  # Формат метки времени (первый столбец)
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024  # Размер сегмента, после которого начинается новый
+INDEX_NAME = "index.json"
+
+
+class SegmentStore:
+    """Журнал в CSV-файле, который только дописывается.
+
+    Каждая запись добавляет в конец файла только новые строки и завершается
+    fsync, поэтому стоимость сохранения не зависит от размера журнала.
+    Если процесс упал посреди записи, при следующем открытии недописанная
+    последняя строка отрезается - все ранее сохраненные строки остаются целыми.
+    """
+
+    def __init__(self, directory, columns, name="device_data_log"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.columns = list(columns)
+        self.path = self.directory / f"{name}.csv"
+        self.created = not self.path.exists()
+        self._repair()
+        self.size = self.path.stat().st_size
+
+    def _repair(self):
+        """Создает файл с заголовком или отрезает недописанную строку"""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            self._write(self._encode([self.columns]), mode='wb')
+            _fsync_dir(self.directory)
+            return
+
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            tail = f.read()
+            if tail.endswith(b'\n'):
+                return
+            cut = tail.rfind(b'\n')
+            new_size = size - len(tail) + cut + 1 if cut >= 0 else 0
+            logging.warning(f"Журнал {self.path}: отрезана недописанная строка ({size - new_size} байт)")
+            f.truncate(new_size)
+            f.flush()
+            os.fsync(f.fileno())
+        if new_size == 0:
+            self._write(self._encode([self.columns]), mode='wb')
+
+    @staticmethod
+    def _encode(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def _write(self, data, mode='ab'):
+        with open(self.path, mode) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, rows):
+        """Дописывает строки в конец журнала (одна запись + fsync)"""
+        if rows:
+            self.append_encoded(self._encode(rows))
+
+    def append_encoded(self, data):
+        """Дописывает уже закодированные строки CSV"""
+        self._write(data)
+        self.size += len(data)
+
+
+class PartitionedStore:
+    """Журнал, разбитый на сегменты по устройствам и дням.
+
+    Сегменты лежат в <каталог>/<устройство>/<день>_<номер>.csv; когда
+    сегмент превышает max_segment_bytes, начинается следующий номер.
+    Файл index.json хранит для каждого сегмента диапазон меток времени,
+    число строк и размер записанных данных, поэтому read_range() открывает
+    только нужные сегменты, а внутри упорядоченного сегмента находит границы
+    диапазона двоичным поиском по отображенному в память файлу.
+
+    Индекс обновляется после записи данных; если процесс упал между ними,
+    расхождение размера обнаруживается при открытии и сегмент
+    пересканируется. Чтение безопасно из любого потока: читается только
+    часть сегмента, уже учтенная в индексе.
+    """
+
+    def __init__(self, directory, columns, max_segment_bytes=SEGMENT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.columns = list(columns)
+        self.max_segment_bytes = max_segment_bytes
+        self.index_path = self.directory / INDEX_NAME
+        self.created = not self.index_path.exists()
+        self._lock = threading.Lock()
+        self._segments = {}  # Относительный путь сегмента -> запись индекса
+        self._current = {}  # (устройство, день) -> путь последнего сегмента
+        self._stores = {}  # (устройство, день) -> SegmentStore дописываемого сегмента
+        self._sealed = set()  # Сегменты, в которые новые строки не пишутся
+        self._load_index()
+
+    # --- Индекс ---
+
+    def _load_index(self):
+        """Читает индекс и сверяет его с сегментами на диске"""
+        index = {}
+        columns = self.columns
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                index = data.get('segments', {})
+                columns = data.get('columns', columns)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Индекс журнала {self.index_path} поврежден, пересканирование: {e}")
+
+        changed = False
+        on_disk = set()
+        for path in self.directory.glob('*/*.csv'):
+            rel = path.relative_to(self.directory).as_posix()
+            on_disk.add(rel)
+            entry = index.get(rel)
+            if entry is None or entry.get('bytes') != path.stat().st_size:
+                try:
+                    entry = self._scan_segment(rel)
+                except (ValueError, OSError) as e:
+                    logging.warning(f"Файл {path} пропущен: не является сегментом журнала ({e})")
+                    continue
+                changed = True
+            self._segments[rel] = entry
+        if set(index) - on_disk:
+            changed = True
+        if columns != self.columns:
+            # Сегменты с прежним набором столбцов больше не дописываются
+            self._sealed = set(self._segments)
+            changed = True
+
+        for rel, entry in self._segments.items():
+            key = (entry['device'], entry['day'])
+            current = self._current.get(key)
+            if current is None or entry['part'] > self._segments[current]['part']:
+                self._current[key] = rel
+        if changed:
+            self._save_index()
+
+    def _scan_segment(self, rel):
+        """Строит запись индекса по содержимому сегмента"""
+        device, name = rel.split('/')
+        day, part = name[:-len('.csv')].rsplit('_', 1)
+        part = int(part)
+        store = SegmentStore(self.directory / device, self.columns, name=name[:-len('.csv')])
+        entry = {'device': device, 'day': day, 'part': part,
+                 't_min': None, 't_max': None, 'rows': 0, 'bytes': 0, 'sorted': True}
+        with open(store.path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            keys = [row[0] for row in reader if row]
+        _update_entry(entry, keys)
+        entry['bytes'] = store.size
+        logging.info(f"Сегмент журнала {rel} проиндексирован: {entry['rows']} строк")
+        return entry
+
+    def _save_index(self):
+        """Атомарно перезаписывает индекс"""
+        with self._lock:
+            data = {'columns': self.columns, 'segments': dict(sorted(self._segments.items()))}
+        temp_path = self.index_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.index_path)
+
+    def segments(self):
+        """Копия индекса: {путь сегмента: запись}"""
+        with self._lock:
+            return {rel: dict(entry) for rel, entry in self._segments.items()}
+
+    # --- Запись ---
+
+    def append(self, rows, device="device"):
+        """Дописывает строки, раскладывая их по дням и сегментам устройства"""
+        if not rows:
+            return
+        device = _safe_name(device)
+        days = {}
+        for row in rows:
+            days.setdefault(str(row[0])[:10], []).append(row)
+        for day, day_rows in days.items():
+            self._append_day(device, _safe_name(day), day_rows)
+        self._save_index()
+
+    def _append_day(self, device, day, rows):
+        """Дописывает строки одного дня, при необходимости начиная новые сегменты"""
+        lines = [SegmentStore._encode([row]) for row in rows]
+        start = 0
+        while start < len(rows):
+            rel = self._writable_segment(device, day, len(lines[start]))
+            budget = self.max_segment_bytes - self._segments[rel]['bytes']
+            end, size = start + 1, len(lines[start])
+            while end < len(rows) and size + len(lines[end]) <= budget:
+                size += len(lines[end])
+                end += 1
+            self._write_segment(rel, b''.join(lines[start:end]), rows[start:end])
+            start = end
+
+    def _writable_segment(self, device, day, size):
+        """Последний сегмент дня или новый, если в последний не помещается size байт"""
+        rel = self._current.get((device, day))
+        if rel is not None and rel not in self._sealed:
+            entry = self._segments[rel]
+            if not entry['rows'] or entry['bytes'] + size <= self.max_segment_bytes:
+                return rel
+        part = self._segments[rel]['part'] + 1 if rel is not None else 0
+        rel = f"{device}/{day}_{part:03d}.csv"
+        store = self._stores[(device, day)] = SegmentStore(self.directory / device, self.columns,
+                                                           name=f"{day}_{part:03d}")
+        with self._lock:
+            self._segments[rel] = {'device': device, 'day': day, 'part': part,
+                                   't_min': None, 't_max': None, 'rows': 0, 'bytes': store.size, 'sorted': True}
+        self._current[(device, day)] = rel
+        if part:
+            logging.info(f"Журнал: начат новый сегмент {rel}")
+        return rel
+
+    def _write_segment(self, rel, data, rows):
+        entry = dict(self._segments[rel])
+        key = (entry['device'], entry['day'])
+        store = self._stores.get(key)
+        if store is None:
+            store = self._stores[key] = SegmentStore(self.directory / entry['device'], self.columns,
+                                                     name=f"{entry['day']}_{entry['part']:03d}")
+        store.append_encoded(data)
+        _update_entry(entry, [str(row[0]) for row in rows])
+        entry['bytes'] = store.size
+        with self._lock:
+            self._segments[rel] = entry
+
+    # --- Чтение ---
+
+    def select(self, t0=None, t1=None, device=None):
+        """Сегменты, пересекающиеся с диапазоном [t0, t1], по возрастанию времени"""
+        lo, hi = time_key(t0), time_key(t1)
+        device = _safe_name(device) if device is not None else None
+        selected = [
+            (rel, entry) for rel, entry in self.segments().items()
+            if entry['rows']
+            and (device is None or entry['device'] == device)
+            and (lo is None or entry['t_max'] >= lo)
+            and (hi is None or entry['t_min'][:len(hi)] <= hi)
+        ]
+        selected.sort(key=lambda item: (item[1]['t_min'], item[0]))
+        return selected
+
+    def read_range_bytes(self, t0=None, t1=None, device=None):
+        """Строки CSV (без заголовка) из диапазона [t0, t1] одним блоком байт"""
+        lo, hi = time_key(t0), time_key(t1)
+        chunks = [self._read_segment(rel, entry, lo, hi) for rel, entry in self.select(t0, t1, device)]
+        return b''.join(chunks)
+
+    def read_range(self, t0=None, t1=None, columns=None, device=None):
+        """Строки журнала из диапазона [t0, t1] (значения - строки CSV)
+
+        :param columns: список нужных столбцов (по умолчанию - все)
+        """
+        indices = [self.columns.index(c) for c in columns] if columns else None
+        rows = csv.reader(io.StringIO(self.read_range_bytes(t0, t1, device).decode('utf-8')))
+        if indices is None:
+            return [row for row in rows if row]
+        return [[row[i] for i in indices] for row in rows if row]
+
+    def _read_segment(self, rel, entry, lo, hi):
+        """Вырезает из сегмента строки диапазона через mmap"""
+        with open(self.directory / rel, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                limit = min(entry['bytes'], len(mm))
+                start = mm.find(b'\n', 0, limit) + 1
+                if start <= 0:
+                    return b''
+                lo_b = lo.encode() if lo is not None else None
+                hi_b = hi.encode() if hi is not None else None
+                if entry['sorted']:
+                    if lo_b is not None:
+                        start = _bisect(mm, start, limit, lo_b, right=False)
+                    end = _bisect(mm, start, limit, hi_b, right=True) if hi_b is not None else limit
+                    return mm[start:end]
+
+                # Неупорядоченный сегмент (например, после перевода часов) - фильтр по строкам
+                lines = mm[start:limit].splitlines(keepends=True)
+                return b''.join(
+                    line for line in lines
+                    if (lo_b is None or _line_key(line) >= lo_b)
+                    and (hi_b is None or _line_key(line)[:len(hi_b)] <= hi_b)
+                )
+
+
+def time_key(value):
+    """Приводит datetime, метку Unix или строку к формату первого столбца"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    return datetime.fromtimestamp(value).strftime(TIME_FORMAT)
+
+
+def _update_entry(entry, keys):
+    """Учитывает в записи индекса новые метки времени (в порядке записи)"""
+    if not keys:
+        return
+    ordered = all(a <= b for a, b in zip(keys, keys[1:]))
+    if not ordered or (entry['t_max'] is not None and keys[0] < entry['t_max']):
+        entry['sorted'] = False
+    entry['t_min'] = min([k for k in (entry['t_min'], min(keys)) if k is not None])
+    entry['t_max'] = max([k for k in (entry['t_max'], max(keys)) if k is not None])
+    entry['rows'] += len(keys)
+
+
+def _line_key(line):
+    """Метка времени (первое поле) строки CSV в байтах"""
+    comma = line.find(b',')
+    return (line[:comma] if comma >= 0 else line.rstrip(b'\r\n')).strip(b'"')
+
+
+def _bisect(mm, lo, hi, key, right):
+    """Смещение первой строки в [lo, hi), метка которой >= key (> key при right).
+
+    lo должен быть началом строки, строки упорядочены по метке времени.
+    При right сравнивается префикс метки длиной key, поэтому граница
+    "10:00:00" включает и "10:00:00.500".
+    """
+    while lo < hi:
+        mid = (lo + hi) // 2
+        newline = mm.rfind(b'\n', lo, mid)
+        start = newline + 1 if newline >= 0 else lo
+        end = mm.find(b'\n', start, hi)
+        end = hi if end < 0 else end + 1
+        line_key = _line_key(mm[start:end])
+        if right:
+            before = line_key[:len(key)] <= key
+        else:
+            before = line_key < key
+        if before:
+            lo = end
+        else:
+            hi = start
+    return lo
+
+
+def _safe_name(name):
+    """Имя, пригодное для каталога или файла"""
+    return re.sub(r'[^\w.-]', '_', str(name)) or "device"
+
+
+def _fsync_dir(directory):
+    """Сбрасывает на диск запись каталога (где это поддерживается)"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
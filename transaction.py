@@ -0,0 +1,79 @@
+"""Модуль последовательного выполнения транзакций ввода-вывода"""
+
+import itertools
+import threading
+from concurrent.futures import Future
+from queue import PriorityQueue
+
+# Приоритеты транзакций: меньшее значение обслуживается раньше
+PRIORITY_COMMAND = 0  # Команды оператора
+PRIORITY_POLL = 10  # Фоновый опрос
+
+
+class TransactionWorker:
+    """Единственный поток ввода-вывода, через который проходят все транзакции.
+
+    Транзакции выполняются строго по одной, поэтому ответы не могут
+    перемешаться между вызывающими потоками. Команды оператора
+    (PRIORITY_COMMAND) обгоняют накопившиеся запросы опроса.
+    """
+
+    def __init__(self, name="io-worker"):
+        self.name = name
+        self._queue = PriorityQueue()
+        self._counter = itertools.count()  # Сохраняет порядок FIFO внутри приоритета
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.t = None
+
+    def start(self):
+        """Запускает поток ввода-вывода, если он еще не запущен"""
+        with self._lock:
+            if self.t is not None and self.t.is_alive():
+                return
+            self.t = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self.t.start()
+
+    def stop(self, timeout=None):
+        """Останавливает поток после выполнения уже поставленных транзакций"""
+        with self._lock:
+            t = self.t
+            self.t = None
+        if t is None or not t.is_alive():
+            return
+        self._queue.put((float('inf'), next(self._counter), None, None, ()))
+        if t is not threading.current_thread():
+            t.join(timeout)
+
+    def in_worker(self):
+        """True, если вызов выполняется в потоке ввода-вывода"""
+        return getattr(self._local, 'is_worker', False)
+
+    def submit(self, func, *args, priority=PRIORITY_POLL):
+        """Ставит транзакцию в очередь и возвращает Future с ее результатом"""
+        future = Future()
+        if self.in_worker():
+            # Вложенный вызов из самой транзакции выполняется сразу,
+            # иначе ожидание результата заблокировало бы поток
+            self._execute(future, func, args)
+            return future
+        self.start()
+        self._queue.put((priority, next(self._counter), future, func, args))
+        return future
+
+    @staticmethod
+    def _execute(future, func, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _run(self):
+        self._local.is_worker = True
+        while True:
+            _, _, future, func, args = self._queue.get()
+            if func is None:
+                break
+            self._execute(future, func, args)
@@ -0,0 +1,59 @@
+"""Модуль связывания отображаемых значений с переменными Tk"""
+
+_UNSET = object()
+
+
+class ViewModel:
+    """Промежуточное состояние между отсчетами и переменными Tk.
+
+    Обработчики данных вызывают set() с сырыми значениями сколько угодно
+    раз за кадр; commit() (один раз за кадр, в потоке Tk) форматирует
+    и передает в Tk только значения, отличающиеся от уже показанных.
+    Каждый var.set() - обращение к Tcl, поэтому неизменные флаги
+    и показания не стоят ничего, а окно с десятками устройств
+    обновляется одной короткой пачкой.
+    """
+
+    def __init__(self):
+        self._bindings = {}  # Имя -> [(переменная Tk, функция форматирования или None)]
+        self._rendered = {}  # Имя -> значение, показанное последним commit()
+        self._pending = {}  # Имя -> значение, ожидающее commit()
+        self.pushed = 0  # Всего вызовов var.set()
+        self.skipped = 0  # Значений, совпавших с показанными
+
+    def bind(self, name, var, fmt=None):
+        """
+        Привязывает переменную Tk к значению name
+
+        :param var: StringVar/IntVar/BooleanVar
+        :param fmt: функция значение -> отображаемое значение (по умолчанию - без изменений)
+        """
+        self._bindings.setdefault(name, []).append((var, fmt))
+
+    def set(self, name, value):
+        """Запоминает новое значение (в Tk попадет при commit(), если изменилось)"""
+        if self._rendered.get(name, _UNSET) == value:
+            self._pending.pop(name, None)  # Значение вернулось к показанному в этом же кадре
+            self.skipped += 1
+        else:
+            self._pending[name] = value
+
+    def get(self, name, default=None):
+        """Последнее заданное значение (ожидающее или показанное)"""
+        return self._pending.get(name, self._rendered.get(name, default))
+
+    def stats(self):
+        """Число обращений к Tk и пропущенных неизменных значений"""
+        return {'pushed': self.pushed, 'skipped': self.skipped, 'pending': len(self._pending)}
+
+    def commit(self):
+        """Передает изменившиеся значения в Tk, возвращает их число"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        for name, value in pending.items():
+            for var, fmt in self._bindings.get(name, ()):
+                var.set(value if fmt is None else fmt(value))
+                self.pushed += 1
+            self._rendered[name] = value
+        return len(pending)